@@ -0,0 +1,131 @@
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import permissions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from users.models import User
+
+from .cache import LocalLRUCache
+from .metrics import auth_token_lookups
+
+TOKEN_CACHE_NAME = 'auth-token'
+STATELESS_USER_CLAIMS = (
+    'email',
+    'username',
+    'first_name',
+    'last_name',
+    'is_staff',
+    'is_superuser',
+)
+
+local_tokens = LocalLRUCache(settings.AUTH_TOKEN_LOCAL_SIZE)
+
+
+def get_token_key(key):
+    return f'{TOKEN_CACHE_NAME}:{key}'
+
+
+def get_local_token(key):
+    token, expires = local_tokens.get(key, (None, 0))
+    if expires < time.monotonic():
+        return None
+    return token
+
+
+def set_local_token(key, token):
+    local_tokens.set(
+        key, (token, time.monotonic() + settings.AUTH_TOKEN_LOCAL_TTL)
+    )
+
+
+def invalidate_tokens(keys):
+    keys = list(keys)
+    for key in keys:
+        local_tokens.delete(key)
+    cache.delete_many([get_token_key(key) for key in keys])
+
+
+def check_token(token, source):
+    auth_token_lookups.increment({
+        'source': source if token is not None else 'invalid'
+    })
+    if token is None:
+        raise AuthenticationFailed(_('Invalid token.'))
+    return token
+
+
+def check_user(user, token):
+    if user is None or not user.is_active:
+        raise AuthenticationFailed(_('User inactive or deleted.'))
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate(self, request):
+        self.safe_method = request.method in permissions.SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, token):
+        if self.safe_method:
+            return copy.copy(token.user)
+        return User.objects.filter(pk=token.user_id).first()
+
+    def get_token(self, key):
+        token = get_local_token(key)
+        if token is not None:
+            return check_token(token, 'local')
+        source = 'shared'
+        token = cache.get(get_token_key(key))
+        if token is None:
+            source = 'database'
+            token = Token.objects.select_related('user').filter(
+                key=key
+            ).first()
+            if token is not None:
+                cache.set(
+                    get_token_key(key),
+                    token,
+                    timeout=settings.AUTH_TOKEN_CACHE_TIMEOUT,
+                )
+        if token is not None:
+            set_local_token(key, token)
+        return check_token(token, source)
+
+    def authenticate_credentials(self, key):
+        token = self.get_token(key)
+        return check_user(self.get_user(token), token)
+
+
+class StatelessTokenAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        self.safe_method = request.method in permissions.SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not self.safe_method:
+            return super().get_user(validated_token)
+        try:
+            user = User(
+                id=validated_token['user_id'],
+                **{
+                    claim: validated_token[claim]
+                    for claim in STATELESS_USER_CLAIMS
+                },
+            )
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        user._state.adding = False
+        user._state.db = 'default'
+        auth_token_lookups.increment({'source': 'stateless'})
+        return user
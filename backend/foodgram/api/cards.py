@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.cache import cache
+from recipes.models import Recipe
+
+from .cache import bump_version, get_version
+from .routers import use_primary
+from .serializers import RecipeCardSerializer
+
+CARDS_CACHE_NAME = 'recipe-cards'
+CARD_STATS = ('hits', 'misses')
+
+
+def get_card_key(version, recipe_id):
+    return f'{CARDS_CACHE_NAME}:{version}:{recipe_id}'
+
+
+def invalidate_cards(recipe_ids):
+    version = get_version(CARDS_CACHE_NAME)
+    cache.delete_many([get_card_key(version, pk) for pk in recipe_ids])
+
+
+def invalidate_all_cards():
+    bump_version(CARDS_CACHE_NAME)
+
+
+def count_cards(name, value):
+    if not value:
+        return
+    key = f'{CARDS_CACHE_NAME}:{name}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        cache.set(key, value, timeout=None)
+
+
+def get_card_stats():
+    keys = {name: f'{CARDS_CACHE_NAME}:{name}' for name in CARD_STATS}
+    values = cache.get_many(keys.values())
+    return {name: values.get(key, 0) for name, key in keys.items()}
+
+
+def build_cards(recipe_ids):
+    recipes = Recipe.objects.filter(
+        id__in=recipe_ids
+    ).select_related('author').with_ingredients()
+    return {
+        card['id']: card
+        for card in RecipeCardSerializer(recipes, many=True).data
+    }
+
+
+def make_absolute(prefix, url):
+    return prefix + url if url and url.startswith('/') else url
+
+
+def merge_card(card, recipe, prefix):
+    card = dict(
+        card,
+        author=dict(
+            card['author'], is_subscribed=recipe.author_is_subscribed
+        ),
+        is_favorited=recipe.is_favorited,
+        is_in_shopping_cart=recipe.is_in_shopping_cart,
+    )
+    card['image'] = make_absolute(prefix, card['image'])
+    if card['image_srcset']:
+        card['image_srcset'] = {
+            extension: ', '.join(
+                make_absolute(prefix, item) for item in srcset.split(', ')
+            )
+            for extension, srcset in card['image_srcset'].items()
+        }
+    return card
+
+
+def get_card_keys(version, recipes):
+    return {recipe.id: get_card_key(version, recipe.id) for recipe in recipes}
+
+
+def assemble_cards(request, recipes, keys, cards):
+    prefix = request.build_absolute_uri('/')[:-1]
+    return [
+        merge_card(cards[keys[recipe.id]], recipe, prefix)
+        for recipe in recipes
+        if keys[recipe.id] in cards
+    ]
+
+
+def load_cards(recipes):
+    keys = get_card_keys(get_version(CARDS_CACHE_NAME), recipes)
+    cards = cache.get_many(keys.values())
+    missing = [pk for pk, key in keys.items() if key not in cards]
+    if missing:
+        with use_primary():
+            built = {
+                keys[pk]: card for pk, card in build_cards(missing).items()
+            }
+        cache.set_many(built, timeout=settings.RECIPE_CARD_TIMEOUT)
+        cards.update(built)
+    hits = len(keys) - len(missing)
+    count_cards('hits', hits)
+    count_cards('misses', len(missing))
+    return keys, cards, hits, len(missing)
+
+
+def render_cards(request, recipes):
+    keys, cards, hits, misses = load_cards(recipes)
+    return assemble_cards(request, recipes, keys, cards), hits, misses
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCAL_CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.WEB_WORKERS <= 1:
+        return []
+    if settings.CACHES['default']['BACKEND'] != LOCAL_CACHE_BACKEND:
+        return []
+    return [
+        Error(
+            'Локальный кеш не разделяется между воркерами gunicorn.',
+            hint=(
+                'Укажите REDIS_URL или CACHE_BACKEND с общим кешем, '
+                'либо запускайте один воркер (GUNICORN_WORKERS=1).'
+            ),
+            id='api.E001',
+        )
+    ]
@@ -0,0 +1,226 @@
+import time
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from recipes.models import RecipeIngredient
+
+from .cache import bump_version, get_version
+from .routers import use_primary
+
+INDEX_NAME = 'recipe-ingredients'
+
+
+def get_sequence_key(version):
+    return f'{INDEX_NAME}:{version}:sequence'
+
+
+def get_change_key(version, sequence):
+    return f'{INDEX_NAME}:{version}:change:{sequence}'
+
+
+def load_recipe_ingredients(recipe_ids=None):
+    queryset = RecipeIngredient.objects.order_by('recipe_id')
+    if recipe_ids is not None:
+        queryset = queryset.filter(recipe_id__in=recipe_ids)
+    recipes = defaultdict(set)
+    for recipe_id, ingredient_id in queryset.values_list(
+        'recipe_id', 'ingredient_id'
+    ).iterator(chunk_size=10000):
+        recipes[recipe_id].add(ingredient_id)
+    return recipes
+
+
+def make_bitmap(positions, size):
+    bitmap = bytearray(size // 8 + 1)
+    for position in positions:
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bitmap, 'little')
+
+
+class RecipeIngredientIndex:
+
+    def __init__(self, recipes):
+        self.recipe_ids = sorted(recipes)
+        self.positions = {
+            recipe_id: position
+            for position, recipe_id in enumerate(self.recipe_ids)
+        }
+        ingredient_positions = defaultdict(list)
+        size_positions = defaultdict(list)
+        for position, recipe_id in enumerate(self.recipe_ids):
+            ingredients = recipes[recipe_id]
+            size_positions[len(ingredients)].append(position)
+            for ingredient_id in ingredients:
+                ingredient_positions[ingredient_id].append(position)
+        self.bitmaps = {
+            ingredient_id: make_bitmap(positions, len(self.recipe_ids))
+            for ingredient_id, positions in ingredient_positions.items()
+        }
+        self.sizes = {
+            size: make_bitmap(positions, len(self.recipe_ids))
+            for size, positions in size_positions.items()
+        }
+
+    def __len__(self):
+        return len(self.positions)
+
+    def update(self, recipe_ids, recipes):
+        for recipe_id in recipe_ids:
+            position = self.positions.get(recipe_id)
+            if position is not None:
+                self.clear(position)
+            ingredients = recipes.get(recipe_id)
+            if not ingredients:
+                if position is not None:
+                    self.recipe_ids[position] = None
+                    del self.positions[recipe_id]
+                continue
+            if position is None:
+                position = len(self.recipe_ids)
+                self.recipe_ids.append(recipe_id)
+                self.positions[recipe_id] = position
+            bit = 1 << position
+            for ingredient_id in ingredients:
+                self.bitmaps[ingredient_id] = (
+                    self.bitmaps.get(ingredient_id, 0) | bit
+                )
+            self.sizes[len(ingredients)] = (
+                self.sizes.get(len(ingredients), 0) | bit
+            )
+
+    def clear(self, position):
+        bit = 1 << position
+        for bitmaps in (self.bitmaps, self.sizes):
+            for key, bitmap in list(bitmaps.items()):
+                if bitmap & bit:
+                    bitmaps[key] = bitmap ^ bit
+
+    def count(self, ingredient_ids):
+        counters = []
+        for ingredient_id in set(ingredient_ids):
+            carry = self.bitmaps.get(ingredient_id, 0)
+            for level, counter in enumerate(counters):
+                if not carry:
+                    break
+                counters[level], carry = counter ^ carry, counter & carry
+            if carry:
+                counters.append(carry)
+        return counters
+
+    def search(self, ingredient_ids, limit):
+        counters = self.count(ingredient_ids)
+        most_found = min(len(set(ingredient_ids)), 2 ** len(counters) - 1)
+        groups = sorted(
+            (-found / size, size - found, size, found)
+            for size in list(self.sizes)
+            for found in range(1, min(size, most_found) + 1)
+        )
+        results = []
+        for _, missing, size, found in groups:
+            matches = self.sizes.get(size, 0)
+            for level, counter in enumerate(counters):
+                matches &= counter if found >> level & 1 else ~counter
+            while matches and len(results) < limit:
+                position = matches.bit_length() - 1
+                matches ^= 1 << position
+                results.append((self.recipe_ids[position], missing))
+            if len(results) >= limit:
+                break
+        return results
+
+
+_index = None
+_index_version = None
+_index_sequence = 0
+_index_lag = None
+_index_lock = Lock()
+
+
+def get_changes(version, start, end):
+    keys = [
+        get_change_key(version, sequence)
+        for sequence in range(start + 1, end + 1)
+    ]
+    values = cache.get_many(keys)
+    changes = []
+    for key in keys:
+        if key not in values:
+            break
+        changes.append(values[key])
+    return changes
+
+
+def refresh_index(version, sequence):
+    global _index, _index_version, _index_sequence, _index_lag
+    lag = sequence - _index_sequence
+    if (
+        _index is None
+        or _index_version != version
+        or not 0 < lag <= settings.COOKABLE_INDEX_MAX_CHANGES
+    ):
+        _index = RecipeIngredientIndex(load_recipe_ingredients())
+        _index_version, _index_sequence, _index_lag = version, sequence, None
+        return
+    changes = get_changes(version, _index_sequence, sequence)
+    if changes:
+        _index.update(changes, load_recipe_ingredients(changes))
+        _index_sequence += len(changes)
+        _index_lag = None
+    if _index_sequence == sequence:
+        return
+    if _index_lag is None:
+        _index_lag = time.monotonic()
+    elif time.monotonic() - _index_lag > settings.COOKABLE_INDEX_JOURNAL_GRACE:
+        _index = None
+        refresh_index(version, sequence)
+
+
+def get_recipe_index():
+    version = get_version(INDEX_NAME)
+    sequence = cache.get(get_sequence_key(version), 0)
+    if (
+        _index is None
+        or _index_version != version
+        or _index_sequence != sequence
+    ):
+        with _index_lock:
+            if (
+                _index is None
+                or _index_version != version
+                or _index_sequence != sequence
+            ):
+                with use_primary():
+                    refresh_index(version, sequence)
+    return _index
+
+
+def record_recipe_changes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    version = get_version(INDEX_NAME)
+    key = get_sequence_key(version)
+    cache.add(key, 0, timeout=None)
+    try:
+        sequence = cache.incr(key, len(recipe_ids))
+    except ValueError:
+        bump_version(INDEX_NAME)
+        return
+    start = sequence - len(recipe_ids) + 1
+    cache.set_many(
+        {
+            get_change_key(version, start + offset): recipe_id
+            for offset, recipe_id in enumerate(recipe_ids)
+        },
+        timeout=settings.COOKABLE_INDEX_JOURNAL_TIMEOUT,
+    )
+
+
+def reset_recipe_index():
+    bump_version(INDEX_NAME)
+
+
+def find_cookable_recipes(ingredient_ids, limit):
+    return get_recipe_index().search(ingredient_ids, limit)
@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+
+
+class ShoppingListExporter:
+    content_type = 'text/plain'
+    extension = 'txt'
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __iter__(self):
+        yield self.header()
+        for row in self.rows:
+            yield self.render_row(row)
+        yield self.footer()
+
+    def header(self):
+        return ''
+
+    def footer(self):
+        return ''
+
+    def render_row(self, row):
+        raise NotImplementedError
+
+
+class TextExporter(ShoppingListExporter):
+
+    def header(self):
+        return 'Список покупок:\n'
+
+    def render_row(self, row):
+        return f'\n{row["name"]} - {row["amount"]}, {row["measurement_unit"]}'
+
+
+class CSVExporter(ShoppingListExporter):
+    content_type = 'text/csv'
+    extension = 'csv'
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def write(self, values):
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerow(values)
+        return self.buffer.getvalue()
+
+    def header(self):
+        return self.write(('Ингредиент', 'Единица измерения', 'Количество'))
+
+    def render_row(self, row):
+        return self.write(
+            (row['name'], row['measurement_unit'], row['amount'])
+        )
+
+
+class JSONExporter(ShoppingListExporter):
+    content_type = 'application/json'
+    extension = 'json'
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.separator = ''
+
+    def header(self):
+        return '['
+
+    def footer(self):
+        return ']'
+
+    def render_row(self, row):
+        chunk = self.separator + json.dumps(row, ensure_ascii=False)
+        self.separator = ','
+        return chunk
+
+
+EXPORTERS = {
+    exporter.extension: exporter
+    for exporter in (TextExporter, CSVExporter, JSONExporter)
+}
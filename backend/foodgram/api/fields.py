@@ -1,13 +1,26 @@
-import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from PIL import Image, UnidentifiedImageError
 from rest_framework import serializers
 
+from .images import ImageTooLarge, clean_image, decode_base64
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать '
+                     '{max_size}x{max_size} пикселей',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name=f'file.{ext}')
+            try:
+                data = clean_image(decode_base64(imgstr), f'file.{ext}')
+            except ImageTooLarge as error:
+                self.fail('too_large', max_size=error.args[0])
+            except (binascii.Error, UnidentifiedImageError, OSError,
+                    Image.DecompressionBombError):
+                self.fail('invalid_image')
         return super().to_internal_value(data)
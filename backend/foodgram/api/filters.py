@@ -1,7 +1,16 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Ingredient, Recipe, Tag
 from users.models import User
 
+from .search import search_recipes
+
+
+def filter_by_tags(queryset, tags):
+    return queryset.filter(Exists(
+        Recipe.tags.through.objects.filter(recipe=OuterRef('pk'), tag__in=tags)
+    ))
+
 
 class RecipeFilter(FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
@@ -9,6 +18,7 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
         field_name='tags__slug',
         to_field_name='slug',
+        method='get_tags_filter',
     )
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited_filter'
@@ -16,6 +26,7 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart_filter'
     )
+    search = filters.CharFilter(method='get_search_filter')
 
     class Meta:
         model = Recipe
@@ -24,8 +35,14 @@ class RecipeFilter(FilterSet):
             'tags',
             'is_favorited',
             'is_in_shopping_cart',
+            'search',
         )
 
+    def get_tags_filter(self, queryset, name, value):
+        if not value:
+            return queryset
+        return filter_by_tags(queryset, value)
+
     def get_is_favorited_filter(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorites__user=self.request.user)
@@ -36,6 +53,9 @@ class RecipeFilter(FilterSet):
             return queryset.filter(carts__user=self.request.user)
         return queryset
 
+    def get_search_filter(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
 
 class IngredientFilter(FilterSet):
     name = filters.CharFilter(lookup_expr='istartswith')
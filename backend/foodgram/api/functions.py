@@ -1,41 +1,258 @@
-from recipes.models import Ingredient, RecipeIngredient
+import hashlib
+
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from recipes.models import (Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingListItem, Tag)
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .cache import bump_version, get_version
+
+SHOPPING_LISTS_CACHE_NAME = 'shopping-lists'
 
 
 def adding_ingredients(ingredients, recipe):
-    ingredient_list = []
-    for ingredient in ingredients:
-        current_ingredient = get_object_or_404(
-            Ingredient,
-            id=ingredient.get('id')
-        )
-        amount = ingredient.get('amount')
-        ingredient_list.append(
-            RecipeIngredient(
-                recipe=recipe,
-                ingredient=current_ingredient,
-                amount=amount
-            )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient_id=ingredient['id'],
+            amount=ingredient['amount']
+        )
+        for ingredient in ingredients
+    )
+
+
+def updating_ingredients(ingredients, recipe):
+    amounts = {
+        ingredient['id']: ingredient['amount'] for ingredient in ingredients
+    }
+    current = {
+        recipe_ingredient.ingredient_id: recipe_ingredient
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe=recipe
         )
-    RecipeIngredient.objects.bulk_create(ingredient_list)
+    }
+    removed = current.keys() - amounts.keys()
+    if removed:
+        RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient_id__in=removed
+        ).delete()
+    changed = []
+    for ingredient_id, recipe_ingredient in current.items():
+        amount = amounts.get(ingredient_id)
+        if amount is not None and amount != recipe_ingredient.amount:
+            recipe_ingredient.amount = amount
+            changed.append(recipe_ingredient)
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ('amount',))
+    adding_ingredients(
+        [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ],
+        recipe,
+    )
 
 
-def adding_recipe(request, instance, serializer_class):
-    serializer = serializer_class(
-        data={'user': request.user.id, 'recipe': instance.id, },
-        context={'request': request}
+def update_counter(model_class, pk, field, delta):
+    model_class.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
     )
-    serializer.is_valid(raise_exception=True)
-    serializer.save()
+
+
+def mark_similar_changed(recipe_id):
+    Recipe.objects.filter(pk=recipe_id).update(similar_changed=timezone.now())
+
+
+def get_relation_sql(model_class, field, ids):
+    quote_name = connection.ops.quote_name
+    target = model_class._meta.get_field(field)
+    return {
+        'table': quote_name(model_class._meta.db_table),
+        'user': quote_name(model_class._meta.get_field('user').column),
+        'column': quote_name(target.column),
+        'target_table': quote_name(target.related_model._meta.db_table),
+        'target_column': quote_name(target.target_field.column),
+        'placeholders': ', '.join(['%s'] * len(ids)),
+    }
+
+
+def insert_relations(model_class, user_id, field, ids):
+    sql = get_relation_sql(model_class, field, ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} ({user}, {column}) '
+            'SELECT %s, {target_column} FROM {target_table} '
+            'WHERE {target_column} IN ({placeholders}) '
+            'ON CONFLICT ({user}, {column}) DO NOTHING '
+            'RETURNING {column}'.format(**sql),
+            [user_id, *ids],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_relations(model_class, user_id, field, ids):
+    sql = get_relation_sql(model_class, field, ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {table} '
+            'WHERE {user} = %s AND {column} IN ({placeholders}) '
+            'RETURNING {column}'.format(**sql),
+            [user_id, *ids],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def toggle_recipes(user, model_class, recipe_ids, add, counter=None,
+                   shopping_list=False):
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    if not recipe_ids:
+        return []
+    with transaction.atomic():
+        if add:
+            changed = insert_relations(
+                model_class, user.id, 'recipe', recipe_ids
+            )
+        else:
+            changed = delete_relations(
+                model_class, user.id, 'recipe', recipe_ids
+            )
+        if not changed:
+            return changed
+        updates = {'similar_changed': timezone.now()}
+        if counter:
+            updates[counter] = Greatest(F(counter) + (1 if add else -1), 0)
+        Recipe.objects.filter(pk__in=changed).update(**updates)
+        if shopping_list:
+            for recipe_id in changed:
+                if add:
+                    add_to_shopping_lists(recipe_id, user.id)
+                else:
+                    remove_from_shopping_lists(recipe_id, user.id)
+    return changed
+
+
+def adding_recipe(request, model_class, instance, serializer_class,
+                  error_message, counter=None, shopping_list=False):
+    if not toggle_recipes(request.user, model_class, [instance.id], True,
+                          counter, shopping_list):
+        return Response(
+            {api_settings.NON_FIELD_ERRORS_KEY: [error_message]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    serializer = serializer_class(instance, context={'request': request})
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-def deleting_recipe(request, model_class, instance, error_message):
-    if not model_class.objects.filter(user=request.user,
-                                      recipe=instance).exists():
+def deleting_recipe(request, model_class, pk, error_message,
+                    counter=None, shopping_list=False):
+    try:
+        pk = int(pk)
+    except (TypeError, ValueError):
+        raise NotFound
+    if not toggle_recipes(request.user, model_class, [pk], False,
+                          counter, shopping_list):
+        get_object_or_404(Recipe, id=pk)
         return Response({'errors': error_message},
                         status=status.HTTP_400_BAD_REQUEST)
-    model_class.objects.filter(user=request.user, recipe=instance).delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def get_shopping_list_version_name(user_id=None):
+    if user_id is None:
+        return SHOPPING_LISTS_CACHE_NAME
+    return f'{SHOPPING_LISTS_CACHE_NAME}:{user_id}'
+
+
+def bump_shopping_list_version(user_id=None):
+    name = get_shopping_list_version_name(user_id)
+    bump_version(name)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump_version(name))
+
+
+def add_to_shopping_lists(recipe_id, user_id=None):
+    quote_name = connection.ops.quote_name
+    item_table = quote_name(ShoppingListItem._meta.db_table)
+    recipe_table = quote_name(RecipeIngredient._meta.db_table)
+    source = (
+        f'SELECT %s, ingredient_id, amount '
+        f'FROM {recipe_table} WHERE recipe_id = %s'
+    )
+    params = [user_id, recipe_id]
+    if user_id is None:
+        source = (
+            f'SELECT cart.user_id, item.ingredient_id, item.amount '
+            f'FROM {quote_name(ShoppingCart._meta.db_table)} AS cart '
+            f'INNER JOIN {recipe_table} AS item '
+            f'ON item.recipe_id = cart.recipe_id WHERE cart.recipe_id = %s'
+        )
+        params = [recipe_id]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {item_table} (user_id, ingredient_id, total_amount) '
+            f'{source} ON CONFLICT (user_id, ingredient_id) DO UPDATE SET '
+            f'total_amount = {item_table}.total_amount '
+            f'+ EXCLUDED.total_amount',
+            params,
+        )
+    bump_shopping_list_version(user_id)
+
+
+def remove_from_shopping_lists(recipe_id, user_id=None):
+    items = ShoppingListItem.objects.filter(
+        ingredient__in=RecipeIngredient.objects.filter(
+            recipe_id=recipe_id
+        ).values('ingredient')
+    )
+    if user_id is None:
+        items = items.filter(user__in=ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values('user'))
+    else:
+        items = items.filter(user_id=user_id)
+    items.update(total_amount=Greatest(
+        F('total_amount') - Subquery(
+            RecipeIngredient.objects.filter(
+                recipe_id=recipe_id, ingredient=OuterRef('ingredient')
+            ).values('amount')
+        ),
+        0
+    ))
+    items.filter(total_amount=0).delete()
+    bump_shopping_list_version(user_id)
+
+
+def get_shopping_list(user):
+    return ShoppingListItem.objects.filter(
+        user=user
+    ).values(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+        amount=F('total_amount'),
+    ).order_by('name', 'measurement_unit')
+
+
+def get_shopping_list_etag(user, file_format):
+    versions = ':'.join(
+        get_version(name) for name in (
+            'ingredients',
+            get_shopping_list_version_name(),
+            get_shopping_list_version_name(user.id),
+        )
+    )
+    digest = hashlib.md5(f'{file_format}:{versions}'.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def get_tag_facets(recipes):
+    return list(Tag.objects.annotate(
+        count=Count('recipe', filter=Q(recipe__in=recipes.values('id')))
+    ).values('id', 'name', 'color', 'slug', 'count'))
@@ -0,0 +1,173 @@
+import base64
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+from recipes.models import Recipe
+
+DECODE_CHUNK_SIZE = 64 * 1024
+RENDITION_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+logger = logging.getLogger(__name__)
+
+renditions_changed = Signal()
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions',
+)
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def decode_base64(data):
+    buffer = SpooledTemporaryFile(max_size=settings.IMAGE_SPOOL_SIZE)
+    for start in range(0, len(data), DECODE_CHUNK_SIZE):
+        buffer.write(base64.b64decode(
+            data[start:start + DECODE_CHUNK_SIZE], validate=True
+        ))
+    buffer.seek(0)
+    return buffer
+
+
+def clean_image(file, name):
+    image = Image.open(file)
+    width, height = image.size
+    max_size = settings.IMAGE_MAX_SIZE
+    if width > max_size or height > max_size:
+        raise ImageTooLarge(max_size)
+    image_format = image.format
+    image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, format=image_format, quality=90)
+    return ContentFile(output.getvalue(), name=name)
+
+
+def get_rendition_name(name, width, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory, 'renditions', f'{stem}_{width}.{extension}'
+    )
+
+
+def get_renditions_key(name):
+    return f'renditions:{name}'
+
+
+def delete_rendition_files(name, widths):
+    for width in widths:
+        for extension in RENDITION_FORMATS:
+            default_storage.delete(get_rendition_name(name, width, extension))
+
+
+def create_renditions(name):
+    with default_storage.open(name) as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    widths = tuple(
+        width for width in settings.IMAGE_RENDITION_WIDTHS
+        if width <= original.width
+    )
+    delete_rendition_files(name, (
+        width for width in settings.IMAGE_RENDITION_WIDTHS
+        if width not in widths
+    ))
+    for width in widths:
+        image = original.copy()
+        image.thumbnail((width, width * 4))
+        for extension, image_format in RENDITION_FORMATS.items():
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                image = image.convert('RGB')
+            output = BytesIO()
+            image.save(output, format=image_format, quality=80)
+            rendition = get_rendition_name(name, width, extension)
+            if default_storage.exists(rendition):
+                default_storage.delete(rendition)
+            default_storage.save(rendition, ContentFile(output.getvalue()))
+    cache.set(get_renditions_key(name), widths, timeout=None)
+    renditions_changed.send(sender=Recipe, name=name)
+
+
+def delete_renditions(name):
+    if Recipe.objects.filter(image=name).exists():
+        return
+    delete_rendition_files(name, settings.IMAGE_RENDITION_WIDTHS)
+    cache.delete(get_renditions_key(name))
+
+
+def log_rendition_error(future):
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось обработать превью изображения',
+            exc_info=future.exception(),
+        )
+
+
+def run_in_thread(function, name):
+    try:
+        function(name)
+    finally:
+        connection.close()
+
+
+def schedule(function, name):
+    if name:
+        executor.submit(run_in_thread, function, name).add_done_callback(
+            log_rendition_error
+        )
+
+
+def schedule_renditions(name):
+    schedule(create_renditions, name)
+
+
+def schedule_renditions_cleanup(name):
+    schedule(delete_renditions, name)
+
+
+def get_rendition_widths(name):
+    key = get_renditions_key(name)
+    widths = cache.get(key)
+    if widths is None:
+        widths = tuple(
+            width for width in settings.IMAGE_RENDITION_WIDTHS
+            if default_storage.exists(get_rendition_name(name, width, 'webp'))
+        )
+        cache.add(key, widths, timeout=None)
+    return widths
+
+
+def get_image_srcset(image, request):
+    if not image:
+        return None
+    widths = get_rendition_widths(image.name)
+    if not widths:
+        return None
+    srcset = {}
+    for extension in RENDITION_FORMATS:
+        urls = []
+        for width in widths:
+            url = default_storage.url(
+                get_rendition_name(image.name, width, extension)
+            )
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls.append(f'{url} {width}w')
+        srcset[extension] = ', '.join(urls)
+    return srcset
@@ -0,0 +1,194 @@
+import json
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from recipes.models import Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+ENDPOINTS = (
+    ('recipes_list', 'get', '/api/recipes/'),
+    ('recipes_list_tags', 'get', '/api/recipes/?tags={tag}&tags={other_tag}'),
+    ('recipes_list_favorited', 'get', '/api/recipes/?is_favorited=1'),
+    ('recipe_retrieve', 'get', '/api/recipes/{recipe}/'),
+    ('favorite_add', 'post', '/api/recipes/{new_recipe}/favorite/'),
+    ('favorite_remove', 'delete', '/api/recipes/{new_recipe}/favorite/'),
+    ('download_shopping_cart', 'get', '/api/recipes/download_shopping_cart/'),
+    ('subscriptions', 'get', '/api/users/subscriptions/'),
+)
+PERCENTILES = (50, 95, 99)
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, rank):
+    values = sorted(values)
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Замер задержки и количества запросов основных эндпоинтов API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Количество замеров каждого эндпоинта',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Количество прогревочных проходов без замеров',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя, от имени которого выполняются запросы',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='benchmark.json',
+            help='Файл для сохранения результатов',
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='Файл с базовыми результатами для сравнения',
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Отключить кеширование на время замеров',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        user = self.get_user(options['user'])
+        self.prepare(user)
+        client = APIClient()
+        client.force_authenticate(user)
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if options['cold']:
+            overrides['CACHES'] = {'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+            }}
+        timings = {name: [] for name, _, _ in ENDPOINTS}
+        queries = {name: [] for name, _, _ in ENDPOINTS}
+        with override_settings(**overrides), transaction.atomic():
+            for iteration in range(options['warmup'] + options['requests']):
+                values = self.get_path_values()
+                for name, method, path in ENDPOINTS:
+                    elapsed, count = self.request(
+                        client, method, path.format(**values)
+                    )
+                    if iteration >= options['warmup']:
+                        timings[name].append(elapsed)
+                        queries[name].append(count)
+            transaction.set_rollback(True)
+        results = {
+            'meta': {
+                'vendor': connection.vendor,
+                'requests': options['requests'],
+                'cold': options['cold'],
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+            },
+            'endpoints': {
+                name: {
+                    **{
+                        f'p{rank}': round(percentile(timings[name], rank), 2)
+                        for rank in PERCENTILES
+                    },
+                    'queries': max(queries[name]),
+                }
+                for name in timings
+            },
+        }
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['endpoints']
+        self.report(results['endpoints'], baseline)
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+            file.write('\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты сохранены в {options["output"]}'
+        ))
+
+    def get_user(self, user_id):
+        users = User.objects.filter(
+            carts__isnull=False, subscriber__isnull=False
+        )
+        if user_id is not None:
+            users = User.objects.filter(id=user_id)
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError(
+                'Пользователь не найден, создайте данные командой '
+                'generate_data'
+            )
+        return user
+
+    def prepare(self, user):
+        self.recipes = list(
+            Recipe.objects.values_list('id', flat=True)[:SAMPLE_SIZE]
+        )
+        self.new_recipes = list(
+            Recipe.objects.exclude(favorites__user=user).values_list(
+                'id', flat=True
+            )[:SAMPLE_SIZE]
+        )
+        self.tags = list(Tag.objects.values_list('slug', flat=True))
+        if not self.new_recipes or len(self.tags) < 2:
+            raise CommandError(
+                'Для замеров нужны рецепты и хотя бы два тега'
+            )
+
+    def get_path_values(self):
+        tag, other_tag = self.random.sample(self.tags, 2)
+        return {
+            'recipe': self.random.choice(self.recipes),
+            'new_recipe': self.random.choice(self.new_recipes),
+            'tag': tag,
+            'other_tag': other_tag,
+        }
+
+    def request(self, client, method, path):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(client, method)(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{method.upper()} {path}: {response.status_code}'
+            )
+        return elapsed, len(context)
+
+    def report(self, endpoints, baseline):
+        for name, result in endpoints.items():
+            line = ', '.join(
+                f'{key} {value}' for key, value in result.items()
+            )
+            previous = (baseline or {}).get(name)
+            if previous:
+                line += ' (' + ', '.join(
+                    self.format_change(key, value, previous.get(key))
+                    for key, value in result.items()
+                ) + ')'
+            self.stdout.write(f'{name}: {line}')
+
+    def format_change(self, key, value, previous):
+        if not previous:
+            return f'{key} новое'
+        return f'{key} {(value - previous) / previous * 100:+.0f}%'
@@ -0,0 +1,73 @@
+import csv
+import os
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from api.search import IngredientIndex
+
+DEFAULT_SIZES = '2000,100000,1000000'
+
+
+class Command(BaseCommand):
+    help = 'Замер скорости автодополнения ингредиентов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=str,
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Файл с названиями ингредиентов',
+        )
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default=DEFAULT_SIZES,
+            help='Размеры индекса через запятую',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=1000,
+            help='Количество запросов на каждый размер',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with open(options['path'], 'rt', encoding='utf-8') as csv_file:
+            base = [
+                (row['name'], row['measurement_unit'])
+                for row in csv.DictReader(csv_file)
+            ]
+        for size in map(int, options['sizes'].split(',')):
+            ingredients = [
+                (pk, *self.make_ingredient(base, pk)) for pk in range(size)
+            ]
+            started = time.perf_counter()
+            index = IngredientIndex(ingredients)
+            build_time = time.perf_counter() - started
+            timings = []
+            for _ in range(options['queries']):
+                name = random.choice(base)[0].split()
+                word = random.choice(name)
+                query = word[:random.randint(1, len(word))]
+                started = time.perf_counter()
+                index.search(query, settings.INGREDIENT_AUTOCOMPLETE_LIMIT)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{size}: построение {build_time:.2f} с, '
+                f'p50 {statistics.median(timings):.3f} мс, '
+                f'p95 {timings[int(len(timings) * 0.95)]:.3f} мс, '
+                f'max {timings[-1]:.3f} мс'
+            )
+
+    def make_ingredient(self, base, pk):
+        name, unit = base[pk % len(base)]
+        if pk >= len(base):
+            name = f'{name} {pk // len(base)}'
+        return name, unit
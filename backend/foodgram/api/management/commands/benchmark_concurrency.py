@@ -0,0 +1,163 @@
+import json
+import socket
+import time
+from threading import Event, Lock, Thread
+from urllib.parse import quote, urlsplit
+
+from django.core.management import BaseCommand, CommandError
+
+from .benchmark_api import PERCENTILES, percentile
+
+PATHS = (
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+    '/api/recipes/',
+    '/api/recipes/?limit=6&page=2',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер пропускной способности запущенного сервера '
+        'при большом количестве медленных клиентов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            default='http://localhost:8000',
+            help='Адрес запущенного сервера',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Количество одновременных клиентов',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Длительность замера в секундах',
+        )
+        parser.add_argument(
+            '--client-delay',
+            type=float,
+            default=0.2,
+            help='Задержка клиента при отправке запроса в секундах',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Запрашиваемый путь, можно указать несколько раз',
+        )
+        parser.add_argument(
+            '--token',
+            type=str,
+            help='Токен пользователя, от имени которого выполняются запросы',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Таймаут одного запроса в секундах',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Файл для сохранения результатов',
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Поддерживаются только адреса http://')
+        self.address = (url.hostname, url.port or 80)
+        self.host = url.netloc
+        self.paths = options['paths'] or PATHS
+        self.token = options['token']
+        self.delay = options['client_delay']
+        self.timeout = options['timeout']
+        self.timings = []
+        self.errors = 0
+        self.lock = Lock()
+        stop = Event()
+        threads = [
+            Thread(target=self.run_client, args=(number, stop), daemon=True)
+            for number in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if not self.timings:
+            raise CommandError(
+                f'Ни один запрос не выполнен, ошибок: {self.errors}'
+            )
+        results = {
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'client_delay': self.delay,
+            'requests': len(self.timings),
+            'errors': self.errors,
+            'rps': round(len(self.timings) / elapsed, 1),
+            **{
+                f'p{rank}': round(percentile(self.timings, rank), 1)
+                for rank in PERCENTILES
+            },
+        }
+        self.stdout.write(', '.join(
+            f'{key} {value}' for key, value in results.items()
+        ))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+                file.write('\n')
+
+    def run_client(self, number, stop):
+        while not stop.is_set():
+            path = self.paths[number % len(self.paths)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                status = self.request(path)
+            except OSError:
+                status = None
+            elapsed = (time.perf_counter() - started) * 1000
+            with self.lock:
+                if status == 200:
+                    self.timings.append(elapsed)
+                else:
+                    self.errors += 1
+
+    def request(self, path):
+        headers = [
+            f'GET {quote(path, safe="/?=&")} HTTP/1.1',
+            f'Host: {self.host}',
+            'Accept: application/json',
+            'Connection: close',
+        ]
+        if self.token:
+            headers.append(f'Authorization: Token {self.token}')
+        request = ('\r\n'.join(headers) + '\r\n\r\n').encode()
+        middle = len(request) // 2
+        with socket.create_connection(
+            self.address, timeout=self.timeout
+        ) as connection:
+            connection.sendall(request[:middle])
+            time.sleep(self.delay)
+            connection.sendall(request[middle:])
+            response = b''
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                response += chunk
+        status_line = response.split(b'\r\n', 1)[0].split()
+        return int(status_line[1]) if len(status_line) > 1 else None
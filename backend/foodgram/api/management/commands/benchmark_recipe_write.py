@@ -0,0 +1,125 @@
+import base64
+import statistics
+import time
+from io import BytesIO
+from uuid import uuid4
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import RecipeCreateSerializer
+from recipes.models import Ingredient, Tag
+from users.models import User
+
+DEFAULT_COUNTS = '1,10,30,100'
+
+
+class Command(BaseCommand):
+    help = 'Замер времени создания и изменения рецепта'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--counts',
+            type=str,
+            default=DEFAULT_COUNTS,
+            help='Количество ингредиентов в рецепте через запятую',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Количество повторов для каждого размера',
+        )
+
+    def handle(self, *args, **options):
+        counts = [int(count) for count in options['counts'].split(',')]
+        with transaction.atomic():
+            self.prepare(max(counts) * 2)
+            for count in counts:
+                self.measure(count, options['repeat'])
+            transaction.set_rollback(True)
+
+    def prepare(self, ingredients_count):
+        suffix = uuid4().hex[:6]
+        self.user = User.objects.create(
+            email=f'benchmark-{suffix}@foodgram.local',
+            username=f'benchmark-{suffix}',
+            first_name='benchmark',
+            last_name='benchmark',
+        )
+        self.tags = Tag.objects.bulk_create(
+            Tag(
+                name=f'benchmark {suffix} {i}',
+                color=f'#{suffix[:5]}{i}',
+                slug=f'bench-{suffix}-{i}',
+            )
+            for i in range(3)
+        )
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'benchmark {suffix} {i}', measurement_unit='г')
+            for i in range(ingredients_count)
+        )
+        buffer = BytesIO()
+        Image.new('RGB', (1, 1)).save(buffer, format='PNG')
+        self.image = (
+            'data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode()
+        )
+        request = Request(APIRequestFactory().post('/'))
+        request.user = self.user
+        self.context = {'request': request}
+
+    def get_data(self, name, ingredients, tags):
+        return {
+            'name': name,
+            'text': 'benchmark',
+            'cooking_time': 1,
+            'image': self.image,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for amount, ingredient in enumerate(ingredients, start=1)
+            ],
+        }
+
+    def save(self, **kwargs):
+        serializer = RecipeCreateSerializer(context=self.context, **kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            serializer.is_valid(raise_exception=True)
+            recipe = serializer.save()
+            elapsed = (time.perf_counter() - started) * 1000
+        return recipe, elapsed, len(queries)
+
+    def measure(self, count, repeat):
+        results = {'create': [], 'update': []}
+        for attempt in range(repeat):
+            recipe, elapsed, create_queries = self.save(data=self.get_data(
+                f'benchmark {count} {attempt}',
+                self.ingredients[:count],
+                self.tags[:2],
+            ))
+            results['create'].append(elapsed)
+            half = count // 2
+            data = self.get_data(
+                recipe.name,
+                self.ingredients[half:half + count],
+                self.tags[1:],
+            )
+            del data['image']
+            _, elapsed, update_queries = self.save(
+                instance=recipe, data=data, partial=True
+            )
+            results['update'].append(elapsed)
+            recipe.image.delete(save=False)
+        for action, timings in results.items():
+            queries = create_queries if action == 'create' else update_queries
+            self.stdout.write(
+                f'{count} ингредиентов, {action}: '
+                f'медиана {statistics.median(timings):.2f} мс, '
+                f'max {max(timings):.2f} мс, запросов: {queries}'
+            )
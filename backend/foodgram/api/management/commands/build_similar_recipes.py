@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.utils import timezone
+from recipes.models import Recipe
+
+from api.similarity import (SimilarityIndex, get_outdated_recipes,
+                            update_similar_recipes)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчёт похожих рецептов по совместному добавлению в избранное '
+        'и списки покупок и по общим ингредиентам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать все рецепты, а не только изменённые',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=settings.SIMILAR_RECIPES_LIMIT,
+            help='Количество похожих рецептов для каждого рецепта',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        timer = time.perf_counter()
+        recipes = Recipe.objects.all()
+        if not options['full']:
+            recipes = get_outdated_recipes()
+        recipe_ids = list(recipes.order_by('id').values_list('id', flat=True))
+        if not recipe_ids:
+            self.stdout.write(self.style.SUCCESS(
+                'Похожие рецепты актуальны'
+            ))
+            return
+        index = SimilarityIndex()
+        self.stdout.write(
+            f'Данные загружены за {time.perf_counter() - timer:.1f} с'
+        )
+        created = 0
+        batch_size = options['batch_size']
+        for start in range(0, len(recipe_ids), batch_size):
+            created += update_similar_recipes(
+                index,
+                recipe_ids[start:start + batch_size],
+                options['limit'],
+                started,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано рецептов: {len(recipe_ids)}, '
+            f'записей: {created}, {time.perf_counter() - timer:.1f} с'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+
+from api.images import create_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание превью для изображений рецептов'
+
+    def handle(self, *args, **options):
+        names = Recipe.objects.exclude(image='').values_list(
+            'image', flat=True
+        )
+        for count, name in enumerate(names.iterator(), start=1):
+            try:
+                create_renditions(name)
+            except OSError as error:
+                self.stderr.write(f'{name}: {error}')
+            if count % 100 == 0:
+                self.stdout.write(f'Обработано изображений: {count}')
+        self.stdout.write(self.style.SUCCESS('Превью созданы'))
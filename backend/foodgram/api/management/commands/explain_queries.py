@@ -0,0 +1,217 @@
+import json
+import re
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+from api.cache import local_cache
+
+ENDPOINTS = (
+    '/api/recipes/',
+    '/api/recipes/?cursor=',
+    '/api/recipes/?author={author}',
+    '/api/recipes/?tags={tag}',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/{recipe}/',
+    '/api/recipes/feed/',
+    '/api/recipes/shopping_list/',
+    '/api/recipes/download_shopping_cart/',
+    '/api/users/',
+    '/api/users/{author}/',
+    '/api/users/subscriptions/',
+    '/api/tags/',
+    '/api/ingredients/?name={ingredient}',
+    '/api/ingredients/autocomplete/?name={ingredient}',
+)
+INTENTIONAL_SCANS = {
+    '/api/ingredients/autocomplete/?name={ingredient}': {
+        'sqlite': {'recipes_ingredient'},
+    },
+}
+SQLITE_ALIAS = re.compile(r'"(\w+)"\s+(?:AS\s+)?"?([A-Z]\d+)"?\b')
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class Command(BaseCommand):
+    help = 'Проверка планов запросов API на последовательное сканирование'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=int,
+            default=1000,
+            help='Допустимое количество строк в таблице '
+                 'при последовательном сканировании',
+        )
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя, от имени которого выполняются запросы',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Выводить планы всех запросов',
+        )
+
+    def handle(self, *args, **options):
+        self.threshold = options['threshold']
+        self.verbose_plans = options['verbose_plans']
+        self.table_rows = {}
+        user = self.get_user(options['user'])
+        client = APIClient()
+        client.force_authenticate(user)
+        values = self.get_path_values()
+        local_cache.clear()
+        failures = []
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+            }},
+        ):
+            for endpoint in ENDPOINTS:
+                allowed = INTENTIONAL_SCANS.get(endpoint, {}).get(
+                    connection.vendor, set()
+                )
+                failures.extend(self.check_endpoint(
+                    client, endpoint.format(**values), allowed
+                ))
+        if failures:
+            raise CommandError(
+                'Последовательное сканирование больших таблиц:\n'
+                + '\n'.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Все запросы используют индексы'
+        ))
+
+    def get_user(self, user_id):
+        users = User.objects.all()
+        if user_id is not None:
+            users = users.filter(id=user_id)
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError('Пользователь не найден')
+        return user
+
+    def get_path_values(self):
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        if recipe is None or tag is None or ingredient is None:
+            raise CommandError(
+                'Для проверки нужны рецепты, теги и ингредиенты'
+            )
+        return {
+            'recipe': recipe.id,
+            'author': recipe.author_id,
+            'tag': tag.slug,
+            'ingredient': ingredient.name[:2],
+        }
+
+    def capture(self, queries):
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.setdefault(sql, params)
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def check_endpoint(self, client, path, allowed):
+        queries = {}
+        with connection.execute_wrapper(self.capture(queries)):
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.stdout.write(
+            f'{path}: {response.status_code}, запросов: {len(queries)}'
+        )
+        failures = []
+        for sql, params in queries.items():
+            for table, rows, plan in self.explain(sql, params):
+                if table in allowed:
+                    self.stdout.write(
+                        f'  Seq Scan {table}: {rows} строк (ожидаемо)'
+                    )
+                    continue
+                failures.append(
+                    f'{path}: {table} ({rows} строк)\n    {sql}'
+                )
+                self.stdout.write(self.style.ERROR(
+                    f'  Seq Scan {table}: {rows} строк'
+                ))
+                if self.verbose_plans:
+                    self.stdout.write(plan)
+        return failures
+
+    def explain(self, sql, params):
+        if connection.vendor == 'postgresql':
+            return self.explain_postgresql(sql, params)
+        if connection.vendor == 'sqlite':
+            return self.explain_sqlite(sql, params)
+        raise CommandError(
+            f'База данных {connection.vendor} не поддерживается'
+        )
+
+    def explain_postgresql(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        text = json.dumps(plan, indent=2, ensure_ascii=False)
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get('Plans', ()))
+            if node['Node Type'] != 'Seq Scan':
+                continue
+            table = node['Relation Name']
+            rows = self.get_table_rows(table)
+            if rows > self.threshold:
+                yield table, rows, text
+
+    def explain_sqlite(self, sql, params):
+        if not hasattr(self, 'tables'):
+            self.tables = set(connection.introspection.table_names())
+        aliases = {
+            alias: table for table, alias in SQLITE_ALIAS.findall(sql)
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            details = [row[-1] for row in cursor.fetchall()]
+        text = '\n'.join(details)
+        for detail in details:
+            match = SQLITE_SCAN.match(detail)
+            if match is None:
+                continue
+            table = aliases.get(match.group(1), match.group(1))
+            if table not in self.tables:
+                continue
+            rows = self.get_table_rows(table)
+            if rows > self.threshold:
+                yield table, rows, text
+
+    def get_table_rows(self, table):
+        if table not in self.table_rows:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(
+                        'SELECT reltuples::bigint FROM pg_class '
+                        'WHERE relname = %s',
+                        [table],
+                    )
+                else:
+                    cursor.execute(
+                        'SELECT COUNT(*) FROM '
+                        f'{connection.ops.quote_name(table)}'
+                    )
+                row = cursor.fetchone()
+            self.table_rows[table] = row[0] if row else 0
+        return self.table_rows[table]
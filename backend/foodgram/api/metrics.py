@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from django.conf import settings
+
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+logger = logging.getLogger(__name__)
+
+current_request = ContextVar('current_request', default=None)
+
+
+class Histogram:
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.values = {}
+        self.lock = Lock()
+
+    def observe(self, labels, value):
+        labels = tuple(sorted(labels.items()))
+        with self.lock:
+            buckets, total, count = self.values.get(
+                labels, ([0] * len(self.buckets), 0, 0)
+            )
+            position = bisect_left(self.buckets, value)
+            if position < len(buckets):
+                buckets[position] += 1
+            self.values[labels] = (buckets, total + value, count + 1)
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            values = sorted(self.values.items())
+        for labels, (buckets, total, count) in values:
+            cumulative = 0
+            for bucket, observed in zip(self.buckets, buckets):
+                cumulative += observed
+                lines.append(self.format(
+                    '_bucket', labels + (('le', bucket),), cumulative
+                ))
+            lines.append(self.format(
+                '_bucket', labels + (('le', '+Inf'),), count
+            ))
+            lines.append(self.format('_sum', labels, total))
+            lines.append(self.format('_count', labels, count))
+        return lines
+
+    def format(self, suffix, labels, value):
+        return f'{self.name}{suffix}{format_labels(labels)} {value}'
+
+
+class Total:
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.values = Counter()
+        self.lock = Lock()
+
+    def increment(self, labels, value=1):
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] += value
+
+    def render(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        return [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} counter',
+            *(
+                f'{self.name}{format_labels(labels)} {value}'
+                for labels, value in values
+            ),
+        ]
+
+
+def format_labels(labels):
+    labels = (('pid', os.getpid()),) + labels
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"'),
+        )
+        for name, value in labels
+    ) + '}'
+
+
+request_duration = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    settings.METRICS_DURATION_BUCKETS,
+)
+request_queries = Histogram(
+    'foodgram_request_queries',
+    'Количество SQL-запросов на один запрос к API',
+    settings.METRICS_QUERY_BUCKETS,
+)
+database_duration = Histogram(
+    'foodgram_database_duration_seconds',
+    'Время выполнения SQL-запросов за один запрос к API',
+    settings.METRICS_DURATION_BUCKETS,
+)
+serializer_duration = Histogram(
+    'foodgram_serializer_duration_seconds',
+    'Время сериализации ответа',
+    settings.METRICS_DURATION_BUCKETS,
+)
+duplicate_queries = Total(
+    'foodgram_duplicate_queries_total',
+    'Повторяющиеся SQL-запросы в пределах одного запроса к API',
+)
+auth_token_lookups = Total(
+    'foodgram_auth_token_lookups_total',
+    'Проверки токенов авторизации по источнику данных',
+)
+METRICS = (
+    request_duration,
+    request_queries,
+    database_duration,
+    serializer_duration,
+    duplicate_queries,
+    auth_token_lookups,
+)
+
+
+def get_fingerprint(sql):
+    return IN_LIST.sub('(%s, ...)', sql)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.database = 0
+        self.serializer = 0
+        self.depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.database += time.perf_counter() - started
+            self.queries[get_fingerprint(sql)] += 1
+
+    def get_duplicates(self):
+        return {
+            sql: count for sql, count in self.queries.items() if count > 1
+        }
+
+    def record(self, view, method):
+        duration = time.perf_counter() - self.started
+        labels = {'view': view, 'method': method}
+        request_duration.observe(labels, duration)
+        request_queries.observe(labels, sum(self.queries.values()))
+        database_duration.observe(labels, self.database)
+        if self.serializer:
+            serializer_duration.observe(labels, self.serializer)
+        for sql, count in self.get_duplicates().items():
+            fingerprint = hashlib.md5(sql.encode()).hexdigest()[:12]
+            duplicate_queries.increment(
+                {'view': view, 'fingerprint': fingerprint}, count - 1
+            )
+            if count >= settings.METRICS_DUPLICATE_THRESHOLD:
+                logger.warning(
+                    '%s: запрос %s выполнен %s раз: %s',
+                    view, fingerprint, count, sql,
+                )
+        return duration
+
+    def get_server_timing(self, duration):
+        return ', '.join((
+            f'total;dur={duration * 1000:.1f}',
+            f'db;dur={self.database * 1000:.1f};'
+            f'desc="{sum(self.queries.values())} queries, '
+            f'{len(self.get_duplicates())} duplicated"',
+            f'serializer;dur={self.serializer * 1000:.1f}',
+        ))
+
+
+@contextmanager
+def measure_serializer():
+    metrics = current_request.get()
+    if metrics is None:
+        yield
+        return
+    metrics.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.depth -= 1
+        if not metrics.depth:
+            metrics.serializer += time.perf_counter() - started
+
+
+def render_metrics(extra=()):
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.extend(extra)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,105 @@
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import RequestMetrics, current_request
+from .routers import REPLICA_PATH_PREFIX, current_replica, get_pin_key
+
+
+def get_view_label(request):
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    if match.url_name:
+        return match.view_name
+    return match.route
+
+
+def wrap_connections(metrics):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(metrics))
+    return stack
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_sampled(self):
+        rate = settings.METRICS_SAMPLE_RATE
+        return rate and (rate >= 1 or random.random() < rate)
+
+    def __call__(self, request):
+        if not self.is_sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        try:
+            with wrap_connections(metrics):
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response.streaming_content, metrics
+            )
+            return response
+        return self.finish(request, response, metrics)
+
+    def stream(self, request, content, metrics):
+        token = current_request.set(metrics)
+        try:
+            with wrap_connections(metrics):
+                yield from content
+        finally:
+            current_request.reset(token)
+            metrics.record(get_view_label(request), request.method)
+
+    def finish(self, request, response, metrics):
+        duration = metrics.record(get_view_label(request), request.method)
+        if settings.METRICS_SERVER_TIMING:
+            response['Server-Timing'] = metrics.get_server_timing(duration)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        key = get_pin_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if key:
+                cache.set(key, True, settings.DATABASE_REPLICA_PIN_TIMEOUT)
+            return response
+        if not request.path.startswith(REPLICA_PATH_PREFIX):
+            return self.get_response(request)
+        if key and cache.get(key):
+            return self.get_response(request)
+        replica = random.choice(settings.DATABASE_REPLICAS)
+        token = current_replica.set(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_replica.reset(token)
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, replica
+            )
+        return response
+
+    def stream(self, content, replica):
+        token = current_replica.set(replica)
+        try:
+            yield from content
+        finally:
+            current_replica.reset(token)
@@ -0,0 +1,49 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.response import Response
+
+from .cache import get_or_build, get_version
+
+
+def get_reference_etag(version, key):
+    return '"{}"'.format(
+        hashlib.md5(f'{version}:{key}'.encode()).hexdigest()
+    )
+
+
+def patch_reference_response(response, etag):
+    response['ETag'] = etag
+    patch_cache_control(
+        response, public=True, max_age=settings.REFERENCE_CACHE_MAX_AGE
+    )
+    return response
+
+
+class CachedReferenceMixin:
+    cache_name = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def get_cached_response(self, request, view, *args, **kwargs):
+        key = request.get_full_path()
+        version = get_version(self.cache_name)
+        etag = get_reference_etag(version, key)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(get_or_build(
+                self.cache_name,
+                version,
+                key,
+                lambda: view(request, *args, **kwargs).data,
+            ))
+        return patch_reference_response(response, etag)
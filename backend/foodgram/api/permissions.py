@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework import permissions
 
 
@@ -15,3 +18,13 @@ class IsAdminAuthorOrReadOnly(permissions.BasePermission):
             or request.user.is_staff
             or obj.author == request.user
         )
+
+
+class HasMetricsToken(permissions.IsAdminUser):
+    def has_permission(self, request, view):
+        if not settings.METRICS_TOKEN:
+            return super().has_permission(request, view)
+        return hmac.compare_digest(
+            request.headers.get('Authorization', ''),
+            f'Bearer {settings.METRICS_TOKEN}',
+        )
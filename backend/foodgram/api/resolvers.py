@@ -0,0 +1,55 @@
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+FLAGS = {
+    'is_subscribed': (Subscription, 'author'),
+    'is_favorited': (Favorite, 'recipe'),
+    'is_in_shopping_cart': (ShoppingCart, 'recipe'),
+}
+
+
+class FlagResolver:
+
+    def __init__(self, user):
+        self.user = user
+        self.flags = {flag: {} for flag in FLAGS}
+
+    def prefetch(self, flag, pks):
+        known = self.flags[flag]
+        missing = set(pks) - known.keys()
+        if not missing:
+            return
+        found = set()
+        if self.user.is_authenticated:
+            model, field = FLAGS[flag]
+            found = set(model.objects.filter(
+                user=self.user, **{f'{field}__in': missing}
+            ).values_list(f'{field}_id', flat=True))
+        known.update((pk, pk in found) for pk in missing)
+
+    def get(self, flag, pk):
+        self.prefetch(flag, (pk,))
+        return self.flags[flag][pk]
+
+
+def get_resolver(request):
+    resolver = getattr(request, '_flag_resolver', None)
+    if resolver is None:
+        resolver = FlagResolver(request.user)
+        request._flag_resolver = resolver
+    return resolver
+
+
+def resolve_flag(request, flag, obj):
+    if hasattr(obj, flag):
+        return getattr(obj, flag)
+    if request is None:
+        return False
+    return get_resolver(request).get(flag, obj.pk)
+
+
+def prefetch_flag(request, flag, objects):
+    if request is not None:
+        get_resolver(request).prefetch(
+            flag, (obj.pk for obj in objects if not hasattr(obj, flag))
+        )
@@ -0,0 +1,52 @@
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_NAME = 'replica-pin'
+PRIMARY_APPS = {'authtoken', 'sessions'}
+REPLICA_PATH_PREFIX = '/api/'
+
+current_replica = ContextVar('current_replica', default=None)
+
+
+def get_pin_key(request):
+    identity = request.headers.get('Authorization') or request.COOKIES.get(
+        settings.SESSION_COOKIE_NAME
+    )
+    if not identity:
+        return None
+    return f'{PIN_NAME}:{hashlib.md5(identity.encode()).hexdigest()}'
+
+
+@contextmanager
+def use_primary():
+    token = current_replica.set(None)
+    try:
+        yield
+    finally:
+        current_replica.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica.get()
+        if (
+            replica is None
+            or model._meta.app_label in PRIMARY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return None
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,194 @@
+import re
+from bisect import bisect_left
+from threading import Lock
+
+from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                            SearchRank)
+from django.db import connection, connections, router
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from recipes.models import Ingredient, Recipe
+
+from .cache import get_version
+
+PREFIX_RANK = 0
+WORD_RANK = 1
+
+RECIPE_SEARCH_CONFIG = 'russian'
+RECIPE_SEARCH_TABLE = 'recipes_recipe_search'
+RECIPE_SEARCH_ORDERING = ('-search_rank', '-pub_date', '-id')
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+
+class IngredientIndex:
+    def __init__(self, ingredients):
+        self.ingredients = []
+        names = []
+        words = []
+        for position, (pk, name, unit) in enumerate(ingredients):
+            self.ingredients.append((pk, name, unit))
+            name = name.lower()
+            names.append((name, position))
+            words.extend(
+                (name[start + 1:], position)
+                for start in range(len(name))
+                if name[start] == ' ' and name[start + 1:start + 2] != ' '
+            )
+        names.sort()
+        words.sort()
+        self.keys = (names, words)
+
+    def __len__(self):
+        return len(self.ingredients)
+
+    def search(self, query, limit):
+        query = query.lower().strip()
+        found = {}
+        for keys in self.keys:
+            index = bisect_left(keys, (query,))
+            while (
+                len(found) < limit
+                and index < len(keys)
+                and keys[index][0].startswith(query)
+            ):
+                found.setdefault(keys[index][1])
+                index += 1
+        return [
+            dict(
+                zip(('id', 'name', 'measurement_unit'),
+                    self.ingredients[position])
+            )
+            for position in found
+        ]
+
+
+_index = None
+_index_version = None
+_index_lock = Lock()
+
+
+def get_ingredient_index():
+    global _index, _index_version
+    version = get_version('ingredients')
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = IngredientIndex(
+                    Ingredient.objects.order_by().values_list(
+                        'id', 'name', 'measurement_unit'
+                    ).iterator(chunk_size=10000)
+                )
+                _index_version = version
+    return _index
+
+
+def search_ingredients(query, limit):
+    query = query.strip()
+    if not query:
+        return []
+    if connection.vendor != 'postgresql':
+        return get_ingredient_index().search(query, limit)
+    return list(
+        Ingredient.objects.filter(
+            Q(name__istartswith=query) | Q(name__icontains=f' {query}')
+        ).annotate(
+            rank=Case(
+                When(name__istartswith=query, then=Value(PREFIX_RANK)),
+                default=Value(WORD_RANK),
+                output_field=IntegerField(),
+            )
+        ).order_by('rank', 'name').values(
+            'id', 'name', 'measurement_unit'
+        )[:limit]
+    )
+
+
+def get_match_query(query):
+    return ' '.join(
+        f'"{term}"*' for term in re.findall(r'\w+', query.lower())
+    )
+
+
+def get_search_query(query):
+    return SearchQuery(
+        query, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+    )
+
+
+def search_recipes(queryset, query):
+    query = query.strip()
+    if not query:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        search_query = get_search_query(query)
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by(*RECIPE_SEARCH_ORDERING)
+    match = get_match_query(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {RECIPE_SEARCH_TABLE} '
+        f'WHERE {RECIPE_SEARCH_TABLE} MATCH %s',
+        (match,),
+    )).annotate(search_rank=RawSQL(
+        f'SELECT -rank FROM {RECIPE_SEARCH_TABLE} '
+        f'WHERE {RECIPE_SEARCH_TABLE} MATCH %s '
+        f'AND rowid = {Recipe._meta.db_table}.id',
+        (match,),
+    )).order_by(*RECIPE_SEARCH_ORDERING)
+
+
+def highlight(value):
+    return escape(value).replace(HIGHLIGHT_START, '<mark>').replace(
+        HIGHLIGHT_STOP, '</mark>'
+    )
+
+
+def get_search_highlights(query, recipe_ids, using=None):
+    query = query.strip()
+    using = using or router.db_for_read(Recipe)
+    recipe_ids = list(recipe_ids)
+    if not query or not recipe_ids:
+        return {}
+    if connections[using].vendor == 'postgresql':
+        search_query = get_search_query(query)
+        options = {
+            'config': RECIPE_SEARCH_CONFIG,
+            'start_sel': HIGHLIGHT_START,
+            'stop_sel': HIGHLIGHT_STOP,
+            'highlight_all': True,
+        }
+        rows = Recipe.objects.using(using).filter(
+            id__in=recipe_ids
+        ).values_list(
+            'id',
+            SearchHeadline('name', search_query, **options),
+            SearchHeadline('text', search_query, **options),
+        )
+    else:
+        match = get_match_query(query)
+        if not match:
+            return {}
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, '
+                f'highlight({RECIPE_SEARCH_TABLE}, 0, %s, %s), '
+                f'highlight({RECIPE_SEARCH_TABLE}, 1, %s, %s) '
+                f'FROM {RECIPE_SEARCH_TABLE} '
+                f'WHERE {RECIPE_SEARCH_TABLE} MATCH %s '
+                f'AND rowid IN ({placeholders})',
+                [
+                    HIGHLIGHT_START, HIGHLIGHT_STOP,
+                    HIGHLIGHT_START, HIGHLIGHT_STOP,
+                    match, *recipe_ids,
+                ],
+            )
+            rows = cursor.fetchall()
+    return {
+        recipe_id: {'name': highlight(name), 'text': highlight(text)}
+        for recipe_id, name, text in rows
+    }
@@ -1,14 +1,32 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Manager
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from djoser.serializers import (
     UserCreateSerializer as DjoserUserCreateSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
-from users.models import Subscription, User
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from users.models import User
 
+from .authentication import STATELESS_USER_CLAIMS
 from .fields import Base64ImageField
-from .functions import adding_ingredients
+from .functions import (add_to_shopping_lists, adding_ingredients,
+                        mark_similar_changed, remove_from_shopping_lists,
+                        update_counter, updating_ingredients)
+from .images import (get_image_srcset, schedule_renditions,
+                     schedule_renditions_cleanup)
+from .metrics import measure_serializer
+from .resolvers import prefetch_flag, resolve_flag
+
+
+class FlagListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        with measure_serializer():
+            data = list(data.all() if isinstance(data, Manager) else data)
+            self.child.prefetch_flags(data)
+            return super().to_representation(data)
 
 
 class TagSerialiser(serializers.ModelSerializer):
@@ -57,13 +75,6 @@ class IngredientPostSerializer(serializers.ModelSerializer):
         model = RecipeIngredient
         fields = ('id', 'amount')
 
-    def validate_id(self, value):
-        if not Ingredient.objects.filter(pk=value).exists():
-            raise serializers.ValidationError(
-                f'Ингредиент с id <{value}> не существует'
-            )
-        return value
-
 
 class UserCreateSerializer(DjoserUserCreateSerializer):
 
@@ -79,6 +90,16 @@ class UserCreateSerializer(DjoserUserCreateSerializer):
         )
 
 
+class StatelessTokenObtainSerializer(TokenObtainPairSerializer):
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in STATELESS_USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
 class UserSerializer(DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -92,17 +113,17 @@ class UserSerializer(DjoserUserSerializer):
             'last_name',
             'is_subscribed',
         )
+        list_serializer_class = FlagListSerializer
+
+    def prefetch_flags(self, users):
+        prefetch_flag(self.context.get('request'), 'is_subscribed', users)
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return (
-            request.user.is_authenticated
-            and obj.subscription.filter(user=request.user,
-                                        author=obj).exists()
-        )
+        return resolve_flag(self.context.get('request'), 'is_subscribed', obj)
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -110,14 +131,16 @@ class RecipeShortSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_srcset',
             'cooking_time',
         )
 
+    def get_image_srcset(self, obj):
+        return get_image_srcset(obj.image, self.context.get('request'))
+
 
 class UserSubscriptionGetSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
-    is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -133,9 +156,16 @@ class UserSubscriptionGetSerializer(UserSerializer):
             'is_subscribed', 'recipes',
             'recipes_count'
         )
+        list_serializer_class = FlagListSerializer
 
     def get_recipes(self, obj):
         request = self.context.get('request')
+        if hasattr(obj, 'limited_recipes'):
+            return RecipeShortSerializer(
+                obj.limited_recipes,
+                many=True,
+                context={'request': request}
+            ).data
         recipes_limit = None
         if request:
             recipes_limit = request.query_params.get('recipes_limit')
@@ -148,44 +178,6 @@ class UserSubscriptionGetSerializer(UserSerializer):
             context={'request': request}
         ).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
-    def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        return (
-            request and request.user.is_authenticated
-            and obj.subscription.filter(user=request.user).exists()
-        )
-
-
-class UserSubscriptionSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = Subscription
-        fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Subscription.objects.all(),
-                fields=('user', 'author'),
-                message='Вы уже подписаны на этого автора'
-            )
-        ]
-
-    def validate(self, data):
-        request = self.context.get('request')
-        if request.user == data['author']:
-            raise serializers.ValidationError(
-                'Нельзя подписаться на себя'
-            )
-        return data
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        return UserSubscriptionGetSerializer(
-            instance.author, context={'request': request}
-        ).data
-
 
 class RecipeGetSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
@@ -198,31 +190,66 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField(required=False, allow_null=True)
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags',
             'author', 'ingredients',
-            'name', 'image',
+            'name', 'image', 'image_srcset',
             'text', 'cooking_time',
             'is_favorited', 'is_in_shopping_cart',
         )
+        list_serializer_class = FlagListSerializer
 
-    def get_is_favorited(self, obj):
+    def prefetch_flags(self, recipes):
         request = self.context.get('request')
-        return (
-            request and request.user.is_authenticated
-            and obj.favorites.filter(user=request.user,
-                                     recipe=obj).exists()
+        prefetch_flag(request, 'is_favorited', recipes)
+        prefetch_flag(request, 'is_in_shopping_cart', recipes)
+        prefetch_flag(
+            request, 'is_subscribed', [recipe.author for recipe in recipes]
         )
 
+    def get_image_srcset(self, obj):
+        return get_image_srcset(obj.image, self.context.get('request'))
+
+    def get_is_favorited(self, obj):
+        return resolve_flag(self.context.get('request'), 'is_favorited', obj)
+
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        return (
-            request and request.user.is_authenticated
-            and obj.carts.filter(user=request.user, recipe=obj).exists()
+        return resolve_flag(
+            self.context.get('request'), 'is_in_shopping_cart', obj
+        )
+
+
+class UserCardSerializer(UserSerializer):
+    is_subscribed = None
+
+    class Meta(UserSerializer.Meta):
+        fields = (
+            'id',
+            'email',
+            'username',
+            'first_name',
+            'last_name',
         )
+        list_serializer_class = serializers.ListSerializer
+
+
+class RecipeCardSerializer(RecipeGetSerializer):
+    author = UserCardSerializer(read_only=True)
+    is_favorited = None
+    is_in_shopping_cart = None
+
+    class Meta(RecipeGetSerializer.Meta):
+        fields = (
+            'id', 'tags',
+            'author', 'ingredients',
+            'name', 'image', 'image_srcset',
+            'text', 'cooking_time',
+        )
+        list_serializer_class = serializers.ListSerializer
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -256,16 +283,25 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'В рецепте не должно быть 2 одинаковых ингредиента'
             )
+        existing = Ingredient.objects.in_bulk(ingredients_id)
+        for ingredient_id in ingredients_id:
+            if ingredient_id not in existing:
+                raise serializers.ValidationError(
+                    f'Ингредиент с id <{ingredient_id}> не существует'
+                )
         return data
 
     def validate_name(self, value):
-        instance = self.instance
-        if Recipe.objects.filter(name=value).exclude(pk=instance.pk).exists():
+        recipes = Recipe.objects.filter(name=value)
+        if self.instance is not None:
+            recipes = recipes.exclude(pk=self.instance.pk)
+        if recipes.exists():
             raise serializers.ValidationError(
                 'Рецепт с таким названием уже существует'
             )
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
         ingredients = validated_data.pop('ingredient_list')
@@ -273,17 +309,31 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=request.user, **validated_data)
         recipe.tags.set(tags)
         adding_ingredients(ingredients, recipe)
+        update_counter(User, request.user.id, 'recipes_count', 1)
+        transaction.on_commit(lambda: schedule_renditions(recipe.image.name))
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredient_list')
-        tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
+        ingredients = validated_data.pop('ingredient_list', None)
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            remove_from_shopping_lists(instance.id)
+            updating_ingredients(ingredients, instance)
+            add_to_shopping_lists(instance.id)
+            mark_similar_changed(instance.id)
+        previous_image = instance.image.name
         super().update(instance, validated_data)
-        adding_ingredients(ingredients, instance)
-        instance.save()
+        if 'image' in validated_data:
+            transaction.on_commit(
+                lambda: schedule_renditions(instance.image.name)
+            )
+            if previous_image != instance.image.name:
+                transaction.on_commit(
+                    lambda: schedule_renditions_cleanup(previous_image)
+                )
         return instance
 
     def to_representation(self, instance):
@@ -294,43 +344,15 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ).data
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
-
-    class Meta:
-        model = Favorite
-        fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=Favorite.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже в избранном'
-            )
-        ]
-
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        return RecipeShortSerializer(
-            instance.recipe,
-            context={'request': request}
-        ).data
-
-
-class ShoppingCartSerializer(serializers.ModelSerializer):
+class RecipeIdListSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPE_BULK_MAX_RECIPES,
+    )
 
-    class Meta:
-        model = ShoppingCart
-        fields = '__all__'
-        validators = [
-            UniqueTogetherValidator(
-                queryset=ShoppingCart.objects.all(),
-                fields=('user', 'recipe'),
-                message='Рецепт уже в списке покупок'
-            )
-        ]
 
-    def to_representation(self, instance):
-        request = self.context.get('request')
-        return RecipeShortSerializer(
-            instance.recipe,
-            context={'request': request}
-        ).data
+class ShoppingListItemSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField()
+    amount = serializers.IntegerField()
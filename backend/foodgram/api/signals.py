@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.signals import objects_imported
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .authentication import invalidate_tokens
+from .cache import bump_version
+from .cards import invalidate_all_cards, invalidate_cards
+from .cookable import record_recipe_changes, reset_recipe_index
+from .images import renditions_changed, schedule_renditions_cleanup
+
+CARD_USER_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def invalidate(function, *args):
+    function(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: function(*args))
+
+
+@receiver((post_save, post_delete, objects_imported), sender=Ingredient)
+def ingredient_changed(sender, signal, **kwargs):
+    invalidate(bump_version, 'ingredients')
+    invalidate(invalidate_all_cards)
+    if signal is objects_imported:
+        reset_recipe_index()
+
+
+@receiver((post_save, post_delete, objects_imported), sender=Tag)
+def tag_changed(sender, **kwargs):
+    invalidate(bump_version, 'tags')
+    invalidate(invalidate_all_cards)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate(invalidate_cards, (instance.id,))
+    transaction.on_commit(lambda: record_recipe_changes((instance.id,)))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    image = instance.image.name
+    transaction.on_commit(lambda: schedule_renditions_cleanup(image))
+
+
+@receiver(renditions_changed, sender=Recipe)
+def recipe_renditions_changed(sender, name, **kwargs):
+    invalidate_cards(list(
+        Recipe.objects.filter(image=name).values_list('id', flat=True)
+    ))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate(invalidate_cards, (instance.recipe_id,))
+    transaction.on_commit(
+        lambda: record_recipe_changes((instance.recipe_id,))
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate(invalidate_cards, (instance.id,))
+    elif pk_set is not None:
+        invalidate(invalidate_cards, tuple(pk_set))
+    else:
+        invalidate(invalidate_all_cards)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not CARD_USER_FIELDS & update_fields:
+        return
+    invalidate(
+        invalidate_cards, list(instance.recipes.values_list('id', flat=True))
+    )
+
+
+@receiver(post_save, sender=User)
+def user_tokens_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    if keys:
+        transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_tokens((instance.key,)))
@@ -0,0 +1,127 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            SimilarRecipe)
+
+CHUNK_SIZE = 10000
+
+
+def get_outdated_recipes():
+    return Recipe.objects.filter(
+        Q(similar_updated__isnull=True)
+        | Q(similar_changed__gt=F('similar_updated'))
+    )
+
+
+def load_sets(queryset, key, value):
+    sets = defaultdict(set)
+    for key_id, value_id in queryset.values_list(key, value).order_by(
+    ).iterator(chunk_size=CHUNK_SIZE):
+        sets[key_id].add(value_id)
+    return sets
+
+
+def invert(sets):
+    inverted = defaultdict(set)
+    for key, values in sets.items():
+        for value in values:
+            inverted[value].add(key)
+    return inverted
+
+
+class SimilarityIndex:
+
+    def __init__(self):
+        self.ingredients = load_sets(
+            RecipeIngredient.objects.all(), 'recipe_id', 'ingredient_id'
+        )
+        self.ingredient_recipes = invert(self.ingredients)
+        self.users = defaultdict(set)
+        for model in (Favorite, ShoppingCart):
+            for recipe_id, users in load_sets(
+                model.objects.all(), 'recipe_id', 'user_id'
+            ).items():
+                self.users[recipe_id] |= users
+        self.baskets = invert(self.users)
+        max_recipes = max(1, int(
+            len(self.ingredients)
+            * settings.SIMILAR_RECIPES_MAX_INGREDIENT_SHARE
+        ))
+        self.common_ingredients = {
+            ingredient
+            for ingredient, recipes in self.ingredient_recipes.items()
+            if len(recipes) > max_recipes
+        }
+
+    def get_cooccurrence(self, recipe_id):
+        users = self.users.get(recipe_id, ())
+        counts = Counter()
+        for user in users:
+            counts.update(self.baskets[user])
+        counts.pop(recipe_id, None)
+        return {
+            other: count / math.sqrt(len(users) * len(self.users[other]))
+            for other, count in counts.items()
+        }
+
+    def get_ingredient_overlap(self, recipe_id):
+        ingredients = self.ingredients.get(recipe_id, set())
+        candidates = set()
+        for ingredient in ingredients - self.common_ingredients:
+            candidates |= self.ingredient_recipes[ingredient]
+        candidates.discard(recipe_id)
+        return {
+            other: (
+                len(ingredients & self.ingredients[other])
+                / len(ingredients | self.ingredients[other])
+            )
+            for other in candidates
+        }
+
+    def get_similar(self, recipe_id, limit):
+        scores = defaultdict(float)
+        for weight, similarity in (
+            (
+                settings.SIMILAR_RECIPES_COOCCURRENCE_WEIGHT,
+                self.get_cooccurrence(recipe_id),
+            ),
+            (
+                settings.SIMILAR_RECIPES_INGREDIENT_WEIGHT,
+                self.get_ingredient_overlap(recipe_id),
+            ),
+        ):
+            for other, value in similarity.items():
+                scores[other] += weight * value
+        return heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+
+
+def update_similar_recipes(index, recipe_ids, limit, started):
+    similar = {
+        recipe_id: index.get_similar(recipe_id, limit)
+        for recipe_id in recipe_ids
+    }
+    with transaction.atomic():
+        existing = set(Recipe.objects.filter(
+            id__in={
+                other for items in similar.values() for other, _ in items
+            } | set(recipe_ids)
+        ).values_list('id', flat=True))
+        SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+        created = SimilarRecipe.objects.bulk_create(
+            SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+            for recipe_id, items in similar.items()
+            if recipe_id in existing
+            for other, score in items
+            if other in existing
+        )
+        Recipe.objects.filter(id__in=recipe_ids).update(
+            similar_updated=started
+        )
+    return len(created)
@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from api.images import create_renditions, get_image_srcset
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+from recipes.models import Recipe
+
+
+class RenditionsTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, IMAGE_RENDITION_WIDTHS=(320, 640, 1280)
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        output = BytesIO()
+        Image.new('RGB', (500, 300)).save(output, format='PNG')
+        self.name = default_storage.save(
+            'recipes/images/recipe.png', ContentFile(output.getvalue())
+        )
+        self.image = Recipe(image=self.name).image
+
+    def test_renditions_are_not_upscaled(self):
+        create_renditions(self.name)
+        files = sorted(default_storage.listdir('recipes/images/renditions')[1])
+        self.assertEqual(files, ['recipe_320.jpeg', 'recipe_320.webp'])
+
+    def test_srcset_does_not_check_storage(self):
+        create_renditions(self.name)
+        with mock.patch.object(default_storage, 'exists') as exists:
+            srcset = get_image_srcset(self.image, None)
+        exists.assert_not_called()
+        self.assertEqual(srcset, {
+            'webp': '/media/recipes/images/renditions/recipe_320.webp 320w',
+            'jpeg': '/media/recipes/images/renditions/recipe_320.jpeg 320w',
+        })
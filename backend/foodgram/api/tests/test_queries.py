@@ -0,0 +1,114 @@
+from api.metrics import request_queries
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from rest_framework.test import APIClient
+from users.models import Subscription, User
+
+LIST_URL = '/api/recipes/'
+DOWNLOAD_URL = f'{LIST_URL}download_shopping_cart/'
+LIMITS = (1, 6, 20)
+
+
+class RecipeQueryCountTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag-{number}')
+            for number in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(10)
+        )
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password12345',
+            )
+            for number in range(3)
+        ]
+        cls.recipes = []
+        for number in range(30):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % 3],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/recipe.png',
+            )
+            recipe.tags.set(tags[:number % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredients[(number + offset) % 10],
+                    amount=offset + 1,
+                )
+                for offset in range(3)
+            )
+            cls.recipes.append(recipe)
+        cls.user = cls.users[0]
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[-1])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[-2])
+        Subscription.objects.create(user=cls.user, author=cls.users[1])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = APIClient()
+        self.authorized_client = APIClient()
+        self.authorized_client.force_authenticate(self.user)
+
+    def assert_list_queries(self, client, number):
+        for limit in LIMITS:
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(number):
+                    response = client.get(LIST_URL, {'limit': limit})
+                self.assertEqual(len(response.data['results']), limit)
+
+    @override_settings(RECIPE_CARD_CACHE=False)
+    def test_list_queries_do_not_grow_with_page_size(self):
+        for client in (self.guest_client, self.authorized_client):
+            self.assert_list_queries(client, 5)
+
+    @override_settings(RECIPE_CARD_CACHE=False)
+    def test_retrieve_queries(self):
+        for client in (self.guest_client, self.authorized_client):
+            with self.assertNumQueries(4):
+                response = client.get(f'{LIST_URL}{self.recipes[0].id}/')
+            self.assertEqual(response.data['id'], self.recipes[0].id)
+
+    @override_settings(RECIPE_CARD_CACHE=True)
+    def test_cached_cards_list_queries(self):
+        for client in (self.guest_client, self.authorized_client):
+            client.get(LIST_URL, {'limit': max(LIMITS)})
+            self.assert_list_queries(client, 2)
+
+    @override_settings(RECIPE_CARD_CACHE=True)
+    def test_cached_cards_retrieve_queries(self):
+        url = f'{LIST_URL}{self.recipes[0].id}/'
+        self.authorized_client.get(url)
+        with self.assertNumQueries(1):
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.data['id'], self.recipes[0].id)
+
+    @override_settings(METRICS_SAMPLE_RATE=1)
+    def test_streamed_queries_are_measured(self):
+        labels = (
+            ('method', 'GET'), ('view', 'recipes-download-shopping-cart')
+        )
+        before = request_queries.values.get(labels, (None, 0, 0))[1:]
+        response = self.authorized_client.get(DOWNLOAD_URL)
+        self.assertEqual(
+            request_queries.values.get(labels, (None, 0, 0))[1:], before
+        )
+        with self.assertNumQueries(1):
+            b''.join(response.streaming_content)
+        self.assertEqual(
+            request_queries.values[labels][1:], (before[0] + 1, before[1] + 1)
+        )
@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import Favorite, Recipe, ShoppingCart
+from rest_framework.test import APIClient
+from users.models import Subscription, User
+
+
+class RelationToggleTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            User.objects.create_user(
+                email=f'{username}@example.com',
+                username=username,
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password12345',
+            )
+            for username in ('user', 'author')
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_toggle_recipe_relations(self):
+        for name, model_class in (
+            ('favorite', Favorite),
+            ('shopping_cart', ShoppingCart),
+        ):
+            with self.subTest(name=name):
+                url = f'/api/recipes/{self.recipe.id}/{name}/'
+                self.assertEqual(self.client.post(url).status_code, 201)
+                self.assertEqual(self.client.post(url).status_code, 400)
+                self.assertTrue(model_class.objects.filter(
+                    user=self.user, recipe=self.recipe
+                ).exists())
+                self.assertEqual(self.client.delete(url).status_code, 204)
+                self.assertEqual(self.client.delete(url).status_code, 400)
+
+    def test_invalid_recipe_id(self):
+        for name in ('favorite', 'shopping_cart'):
+            for pk in ('abc', '999999'):
+                url = f'/api/recipes/{pk}/{name}/'
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.post(url).status_code, 404)
+                    self.assertEqual(
+                        self.client.delete(url).status_code, 404
+                    )
+
+    def test_shopping_list_etag(self):
+        url = '/api/recipes/download_shopping_cart/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_toggle_subscription(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertTrue(Subscription.objects.filter(
+            user=self.user, author=self.author
+        ).exists())
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 400)
@@ -0,0 +1,147 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import (RequestFactory, TransactionTestCase,
+                         override_settings)
+from recipes.models import Ingredient, Recipe, ShoppingListItem
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+from api.authentication import local_tokens
+from api.middleware import ReplicaRoutingMiddleware
+from api.routers import current_replica
+
+REPLICA = 'replica1'
+
+
+@override_settings(
+    DATABASE_REPLICAS=[REPLICA],
+    DATABASE_REPLICA_PIN_TIMEOUT=1,
+    RECIPE_CARD_CACHE=False,
+)
+class ReplicaRoutingTest(TransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.mkdtemp()
+        connections.settings[REPLICA] = {
+            **connections.settings['default'],
+            'NAME': os.path.join(cls.replica_dir, 'replica.sqlite3'),
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+        shutil.rmtree(cls.replica_dir)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        local_tokens.clear()
+        self.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Имя',
+            last_name='Фамилия',
+            password='password12345',
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+        self.copy_to_replica()
+        Recipe.objects.filter(id=self.recipe.id).update(name='Новый рецепт')
+        self.token = Token.objects.create(user=self.author)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = f'/api/recipes/{self.recipe.id}/'
+
+    def copy_to_replica(self):
+        connections[REPLICA].close()
+        connection.ensure_connection()
+        replica = sqlite3.connect(connections.settings[REPLICA]['NAME'])
+        try:
+            connection.connection.backup(replica)
+        finally:
+            replica.close()
+
+    def pin(self):
+        response = self.client.post(f'{self.url}favorite/')
+        self.assertEqual(response.status_code, 201)
+
+    def test_safe_requests_read_from_replica(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.data['name'], 'Рецепт')
+
+    def test_only_api_requests_are_routed(self):
+        replicas = []
+
+        def get_response(request):
+            replicas.append(current_replica.get())
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        for path in ('/api/recipes/', '/admin/', '/media/recipe.png'):
+            middleware(RequestFactory().get(path))
+        self.assertEqual(replicas, [REPLICA, None, None])
+
+    def test_streamed_response_reads_from_replica(self):
+        ShoppingListItem.objects.create(
+            user=self.author,
+            ingredient=Ingredient.objects.create(
+                name='Мука', measurement_unit='г'
+            ),
+            total_amount=100,
+        )
+        response = self.client.get('/api/recipes/download_shopping_cart/')
+        self.assertNotIn('Мука', b''.join(response.streaming_content).decode())
+
+    def test_token_is_checked_on_primary(self):
+        response = self.client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.author.id)
+
+    def test_unsafe_request_pins_reads_to_primary(self):
+        self.assertEqual(self.client.get(self.url).data['name'], 'Рецепт')
+        self.pin()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['name'], 'Новый рецепт')
+        self.assertTrue(response.data['is_favorited'])
+        self.assertEqual(APIClient().get(self.url).data['name'], 'Рецепт')
+
+    def test_pin_expires(self):
+        self.pin()
+        time.sleep(1.1)
+        self.assertEqual(self.client.get(self.url).data['name'], 'Рецепт')
+
+    @override_settings(RECIPE_CARD_CACHE=True)
+    def test_cards_are_built_on_primary(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.data['name'], 'Новый рецепт')
+
+    def test_atomic_block_reads_from_primary(self):
+        token = current_replica.set(REPLICA)
+        try:
+            self.assertEqual(
+                Recipe.objects.get(id=self.recipe.id).name, 'Рецепт'
+            )
+            with transaction.atomic():
+                self.assertEqual(
+                    Recipe.objects.get(id=self.recipe.id).name,
+                    'Новый рецепт',
+                )
+        finally:
+            current_replica.reset(token)
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (IngredientViewSet, RecipeViewSet, TagViewSet,
-                    UserSubscriptionGetViewSet, UserSubscriptionView)
+from .views import (IngredientViewSet, MetricsView, RecipeViewSet,
+                    TagViewSet, UserSubscriptionGetViewSet,
+                    UserSubscriptionView)
 
 router = routers.DefaultRouter()
 router.register(r'tags', TagViewSet, basename='tags')
@@ -11,6 +13,7 @@ router.register(r'recipes', RecipeViewSet, basename='recipes')
 
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view()),
     path('users/subscriptions/',
          UserSubscriptionGetViewSet.as_view({'get': 'list'})),
     path('users/<int:user_id>/subscribe/',
@@ -19,3 +22,6 @@ urlpatterns = [
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.AUTH_STATELESS_TOKENS:
+    urlpatterns.append(path('auth/', include('djoser.urls.jwt')))
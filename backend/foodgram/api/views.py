@@ -1,33 +1,50 @@
-from django.db.models import Sum
-from django.shortcuts import HttpResponse, get_object_or_404
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, Value
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            SimilarRecipe, Tag)
 from rest_framework import filters, mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from users.models import Subscription, User
 
+from .cards import get_card_stats, render_cards
+from .cookable import find_cookable_recipes
+from .exporters import EXPORTERS
 from .filters import RecipeFilter
-from .functions import adding_recipe, deleting_recipe
-from .permissions import IsAdminAuthorOrReadOnly
-from .serializers import (FavoriteSerializer, IngredientSerializer,
-                          RecipeCreateSerializer, RecipeGetSerializer,
-                          ShoppingCartSerializer, TagSerialiser,
-                          UserSubscriptionGetSerializer,
-                          UserSubscriptionSerializer)
+from .functions import (adding_recipe, delete_relations, deleting_recipe,
+                        get_shopping_list, get_shopping_list_etag,
+                        get_tag_facets, insert_relations,
+                        remove_from_shopping_lists, toggle_recipes,
+                        update_counter)
+from .metrics import measure_serializer, render_metrics
+from .mixins import CachedReferenceMixin
+from .pagination import CursorLimitPagination
+from .permissions import HasMetricsToken, IsAdminAuthorOrReadOnly
+from .search import get_search_highlights, search_ingredients
+from .serializers import (IngredientSerializer, RecipeCreateSerializer,
+                          RecipeGetSerializer, RecipeIdListSerializer,
+                          RecipeShortSerializer, ShoppingListItemSerializer,
+                          TagSerialiser, UserSubscriptionGetSerializer)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
+    cache_name = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerialiser
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedReferenceMixin, viewsets.ReadOnlyModelViewSet):
+    cache_name = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
@@ -35,43 +52,83 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('^name',)
     pagination_class = None
 
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+            ))
+        except ValueError:
+            limit = settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        limit = max(1, min(limit, settings.INGREDIENT_AUTOCOMPLETE_MAX_LIMIT))
+        ingredients = search_ingredients(
+            request.query_params.get('name', ''), limit
+        )
+        return Response(self.get_serializer(ingredients, many=True).data)
+
 
 class UserSubscriptionGetViewSet(
     mixins.ListModelMixin,
     viewsets.GenericViewSet
 ):
     serializer_class = UserSubscriptionGetSerializer
+    cursor_ordering = ('username', 'id')
 
     def get_queryset(self):
-        return User.objects.filter(subscription__user=self.request.user)
+        recipes = Recipe.objects.all()
+        recipes_limit = self.request.query_params.get('recipes_limit', '')
+        if recipes_limit.isdigit():
+            recipes = recipes[:int(recipes_limit)]
+        return User.objects.filter(
+            subscription__user=self.request.user
+        ).annotate(
+            is_subscribed=Value(True)
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
 
 
 class UserSubscriptionView(APIView):
     def post(self, request, user_id):
         author = get_object_or_404(User, id=user_id)
-        serializer = UserSubscriptionSerializer(
-            data={'user': request.user.id, 'author': author.id},
-            context={'request': request}
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if author.id == request.user.id:
+            return Response(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Нельзя подписаться на себя'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        with transaction.atomic():
+            if not insert_relations(
+                Subscription, request.user.id, 'author', [author.id]
+            ):
+                return Response(
+                    {api_settings.NON_FIELD_ERRORS_KEY: [
+                        'Вы уже подписаны на этого автора'
+                    ]},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            update_counter(User, author.id, 'subscribers_count', 1)
         return Response(
-            serializer.data,
+            UserSubscriptionGetSerializer(
+                author, context={'request': request}
+            ).data,
             status=status.HTTP_201_CREATED
         )
 
     def delete(self, request, user_id):
-        author = get_object_or_404(User, id=user_id)
-        if not Subscription.objects.filter(user=request.user, author=author
-                                           ).exists():
+        with transaction.atomic():
+            deleted = delete_relations(
+                Subscription, request.user.id, 'author', [user_id]
+            )
+            if deleted:
+                update_counter(User, user_id, 'subscribers_count', -1)
+        if not deleted:
+            get_object_or_404(User, id=user_id)
             return Response(
                 {'errors': 'Вы не подписаны на этого автора'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        Subscription.objects.get(
-            user=request.user.id,
-            author=user_id
-        ).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -80,28 +137,172 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAdminAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    cursor_ordering = ('-pub_date', '-id')
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve', 'feed', 'similar', 'cookable'):
+            if settings.RECIPE_CARD_CACHE:
+                return Recipe.objects.for_cards(self.request.user)
+            return Recipe.objects.for_list(self.request.user)
+        return super().get_queryset()
+
     def get_serializer_class(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'feed', 'similar', 'cookable'):
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
+    def get_recipes_data(self, recipes):
+        if not settings.RECIPE_CARD_CACHE:
+            return self.get_serializer(recipes, many=True).data
+        with measure_serializer():
+            data, hits, misses = render_cards(self.request, recipes)
+        self.card_stats = f'hits={hits}, misses={misses}'
+        return data
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if getattr(self, 'card_stats', None):
+            response['X-Recipe-Cards'] = self.card_stats
+        return response
+
+    def get_search_data(self, recipes):
+        data = self.get_recipes_data(recipes)
+        query = self.request.query_params.get('search', '')
+        if query.strip():
+            highlights = get_search_highlights(
+                query, [recipe['id'] for recipe in data]
+            )
+            for recipe in data:
+                recipe['search_highlight'] = highlights.get(recipe['id'])
+        return data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.get_search_data(queryset))
+        response = self.get_paginated_response(self.get_search_data(page))
+        if request.query_params.get('facets') == 'tags':
+            response.data['facets'] = {'tags': self.get_tag_facets()}
+        return response
+
+    def get_tag_facets(self):
+        params = self.request.query_params.copy()
+        params.pop('tags', None)
+        filterset = self.filterset_class(
+            params, queryset=Recipe.objects.all(), request=self.request
+        )
+        return get_tag_facets(filterset.qs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_recipes_data([self.get_object()])[0])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        remove_from_shopping_lists(instance.id)
+        instance.delete()
+        update_counter(User, instance.author_id, 'recipes_count', -1)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=CursorLimitPagination,
+    )
+    def feed(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            author__in=Subscription.objects.filter(
+                user=request.user
+            ).values('author')
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_search_data(page))
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[AllowAny],
+        pagination_class=None,
+    )
+    def cookable(self, request):
+        ingredient_ids = {
+            int(value)
+            for values in request.query_params.getlist('ingredients')
+            for value in values.split(',')
+            if value.strip().isdigit()
+        }
+        if not ingredient_ids:
+            return Response(
+                {'errors': 'Укажите id имеющихся ингредиентов'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.COOKABLE_RECIPES_LIMIT
+            ))
+        except ValueError:
+            limit = settings.COOKABLE_RECIPES_LIMIT
+        limit = max(1, min(limit, settings.COOKABLE_RECIPES_MAX_LIMIT))
+        missing = dict(find_cookable_recipes(ingredient_ids, limit))
+        recipes = self.get_queryset().in_bulk(missing)
+        data = self.get_recipes_data([
+            recipes[recipe_id] for recipe_id in missing
+            if recipe_id in recipes
+        ])
+        for recipe in data:
+            recipe['missing_ingredients'] = missing[recipe['id']]
+        return Response(data)
+
+    @action(
+        detail=True,
+        methods=['get'],
+        permission_classes=[AllowAny],
+        pagination_class=None,
+    )
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe, id=pk)
+        try:
+            limit = int(request.query_params.get(
+                'limit', settings.SIMILAR_RECIPES_LIMIT
+            ))
+        except ValueError:
+            limit = settings.SIMILAR_RECIPES_LIMIT
+        limit = max(1, min(limit, settings.SIMILAR_RECIPES_LIMIT))
+        similar_ids = list(SimilarRecipe.objects.filter(
+            recipe=recipe
+        ).values_list('similar_id', flat=True)[:limit])
+        recipes = self.get_queryset().in_bulk(similar_ids)
+        return Response(self.get_recipes_data([
+            recipes[similar_id]
+            for similar_id in similar_ids
+            if similar_id in recipes
+        ]))
+
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated]
     )
     def favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
         if request.method == 'POST':
-            return adding_recipe(request, recipe, FavoriteSerializer)
+            return adding_recipe(
+                request,
+                Favorite,
+                get_object_or_404(Recipe, id=pk),
+                RecipeShortSerializer,
+                'Рецепт уже в избранном',
+                counter='favorites_count',
+            )
         error_message = 'Нет такого рецепта в избранном'
         return deleting_recipe(
             request,
             Favorite,
-            recipe,
+            pk,
             error_message,
+            counter='favorites_count',
         )
 
     @action(
@@ -110,20 +311,73 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
         if request.method == 'POST':
             return adding_recipe(
                 request,
-                recipe,
-                ShoppingCartSerializer,
+                ShoppingCart,
+                get_object_or_404(Recipe, id=pk),
+                RecipeShortSerializer,
+                'Рецепт уже в списке покупок',
+                shopping_list=True,
             )
         error_message = 'Нет такого рецепта в списке покупок'
         return deleting_recipe(
             request,
             ShoppingCart,
-            recipe,
-            error_message
+            pk,
+            error_message,
+            shopping_list=True,
+        )
+
+    def toggle_recipes(self, request, model_class, **kwargs):
+        serializer = RecipeIdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        changed = set(toggle_recipes(
+            request.user,
+            model_class,
+            recipe_ids,
+            request.method == 'POST',
+            **kwargs,
+        ))
+        return Response({
+            'changed': sorted(changed),
+            'unchanged': sorted(set(recipe_ids) - changed),
+        })
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='favorite',
+        url_name='favorite-bulk',
+    )
+    def favorite_bulk(self, request):
+        return self.toggle_recipes(
+            request, Favorite, counter='favorites_count'
+        )
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+    )
+    def shopping_cart_bulk(self, request):
+        return self.toggle_recipes(request, ShoppingCart, shopping_list=True)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=None,
+    )
+    def shopping_list(self, request):
+        serializer = ShoppingListItemSerializer(
+            get_shopping_list(request.user), many=True
         )
+        return Response(serializer.data)
 
     @action(
         detail=False,
@@ -131,19 +385,52 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__carts__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(ingredient_amount=Sum('amount'))
-        shopping_list = ['Список покупок:\n']
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['ingredient_amount']
-            shopping_list.append(f'\n{name} - {amount}, {unit}')
-        response = HttpResponse(shopping_list, content_type='text/plain')
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.txt"'
-        )
+        file_format = request.query_params.get('file_format', 'txt')
+        exporter_class = EXPORTERS.get(file_format)
+        if exporter_class is None:
+            return Response(
+                {'errors': f'Формат <{file_format}> не поддерживается'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        etag = get_shopping_list_etag(request.user, file_format)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            ingredients = get_shopping_list(request.user).iterator(
+                chunk_size=2000
+            )
+            response = StreamingHttpResponse(
+                exporter_class(ingredients),
+                content_type=exporter_class.content_type,
+            )
+            response['Content-Disposition'] = (
+                'attachment; '
+                f'filename="shopping_cart.{exporter_class.extension}"'
+            )
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
         return response
+
+
+class MetricsView(APIView):
+    permission_classes = (HasMetricsToken,)
+
+    def get_authenticators(self):
+        if settings.METRICS_TOKEN:
+            return []
+        return super().get_authenticators()
+
+    def get(self, request):
+        cards = get_card_stats()
+        return HttpResponse(
+            render_metrics((
+                '# HELP foodgram_recipe_cards_total '
+                'Обращения к кешу карточек рецептов',
+                '# TYPE foodgram_recipe_cards_total counter',
+                *(
+                    f'foodgram_recipe_cards_total{{result="{result}"}} '
+                    f'{count}'
+                    for result, count in cards.items()
+                ),
+            )),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 from dotenv import load_dotenv
 
@@ -32,6 +33,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -65,6 +68,10 @@ TEMPLATES = [
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_PIN_TIMEOUT = int(os.getenv('DB_REPLICA_PIN_TIMEOUT', 5))
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
 if os.getenv('POSTGRES_ON', 'False') == 'True':
     DATABASES = {
         'default': {
@@ -73,9 +80,25 @@ if os.getenv('POSTGRES_ON', 'False') == 'True':
             'USER': os.getenv('POSTGRES_USER', 'postgres'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'password'),
             'HOST': os.getenv('DB_HOST', 'db'),
-            'PORT': os.getenv('DB_PORT', '5432')
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_POOLED', 'False') == 'True'
+            ),
         }
     }
+    for number, address in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1
+    ):
+        host, _, port = address.strip().partition(':')
+        DATABASES[f'replica{number}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS.append(f'replica{number}')
 else:
     DATABASES = {
         'default': {
@@ -85,6 +108,53 @@ else:
     }
 
 
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.redis.RedisCache' if REDIS_URL
+            else 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', REDIS_URL or 'foodgram'),
+    }
+}
+
+WEB_WORKERS = int(os.getenv('GUNICORN_WORKERS', 1))
+
+REFERENCE_CACHE_LOCAL_SIZE = 256
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+REFERENCE_CACHE_MAX_AGE = 60 * 5
+
+RECIPE_CARD_CACHE = os.getenv('RECIPE_CARD_CACHE', 'True') == 'True'
+RECIPE_CARD_TIMEOUT = 60 * 60 * 24
+
+SIMILAR_RECIPES_LIMIT = 10
+SIMILAR_RECIPES_COOCCURRENCE_WEIGHT = 0.7
+SIMILAR_RECIPES_INGREDIENT_WEIGHT = 0.3
+SIMILAR_RECIPES_MAX_INGREDIENT_SHARE = 0.1
+
+COOKABLE_RECIPES_LIMIT = 20
+COOKABLE_RECIPES_MAX_LIMIT = 100
+COOKABLE_INDEX_MAX_CHANGES = 1000
+COOKABLE_INDEX_JOURNAL_TIMEOUT = 60 * 60
+COOKABLE_INDEX_JOURNAL_GRACE = 5
+
+RECIPE_BULK_MAX_RECIPES = 100
+
+ADMIN_EXACT_COUNT_LIMIT = 10000
+
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0))
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', str(DEBUG)) == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+METRICS_QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+METRICS_DUPLICATE_THRESHOLD = 5
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -118,6 +188,11 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_MAX_SIZE = 6000
+IMAGE_SPOOL_SIZE = 2 * 1024 * 1024
+IMAGE_RENDITION_WIDTHS = (320, 640, 1280)
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', 2))
+
 
 AUTH_USER_MODEL = 'users.User'
 
@@ -129,7 +204,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -138,6 +213,26 @@ REST_FRAMEWORK = {
     'SEARCH_PARAM': 'name',
 }
 
+AUTH_TOKEN_LOCAL_SIZE = 2048
+AUTH_TOKEN_LOCAL_TTL = 10
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 60
+AUTH_STATELESS_TOKENS = os.getenv('AUTH_STATELESS_TOKENS', 'False') == 'True'
+
+if AUTH_STATELESS_TOKENS:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].append(
+        'api.authentication.StatelessTokenAuthentication'
+    )
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.serializers.StatelessTokenObtainSerializer',
+}
+
+INGREDIENT_AUTOCOMPLETE_LIMIT = 10
+INGREDIENT_AUTOCOMPLETE_MAX_LIMIT = 50
+
 DJOSER = {
     'PERMISSIONS': {
         'user': ['rest_framework.permissions.IsAuthenticated'],
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from foodgram.paginators import EstimatedCountPaginator
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
 
 
 @admin.register(Tag)
@@ -15,14 +16,20 @@ class TagAdmin(admin.ModelAdmin):
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
     search_fields = ('name',)
     ordering = ('measurement_unit',)
     empty_value_display = '-пусто-'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
 
 
 @admin.register(Recipe)
@@ -35,14 +42,15 @@ class RecipeAdmin(admin.ModelAdmin):
         'favorites_count',
         'pub_date',
     )
+    list_select_related = ('author',)
     readonly_fields = ('favorites_count',)
-    search_fields = ('name', 'author',)
-    list_filter = ('name', 'author', 'tags',)
+    search_fields = ('name', 'author__username',)
+    list_filter = ('tags',)
+    autocomplete_fields = ('author', 'tags',)
     empty_value_display = '-пусто-'
     inlines = (RecipeIngredientInline,)
-
-    def favorites_count(self, obj):
-        return obj.favorites.count()
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(RecipeIngredient)
@@ -53,22 +61,42 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
         'ingredient',
         'amount',
     )
-    list_filter = ('recipe', 'ingredient')
-    search_fields = ('recipe', 'ingredient')
+    list_select_related = ('recipe', 'ingredient',)
+    search_fields = ('recipe__name', 'ingredient__name',)
+    autocomplete_fields = ('recipe', 'ingredient',)
     empty_value_display = '-пусто-'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe',)
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    search_fields = ('user__username', 'recipe__name',)
+    autocomplete_fields = ('user', 'recipe',)
     empty_value_display = '-пусто-'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe',)
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    search_fields = ('user__username', 'recipe__name',)
+    autocomplete_fields = ('user', 'recipe',)
+    empty_value_display = '-пусто-'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'ingredient', 'total_amount',)
+    list_select_related = ('user', 'ingredient',)
+    search_fields = ('user__username', 'ingredient__name',)
+    autocomplete_fields = ('user', 'ingredient',)
     empty_value_display = '-пусто-'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
@@ -0,0 +1,243 @@
+import csv
+import os
+import random
+import time
+from io import BytesIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, call_command
+from django.db import transaction
+from PIL import Image
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from recipes.signals import objects_imported
+from users.models import Subscription, User
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+IMAGE_NAME = 'recipes/images/generated.png'
+
+
+def zipf_weights(size, exponent):
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = 'Генерация тестовых пользователей, рецептов, избранного и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Количество пользователей',
+        )
+        parser.add_argument(
+            '--authors',
+            type=float,
+            default=0.2,
+            help='Доля пользователей, публикующих рецепты',
+        )
+        parser.add_argument(
+            '--recipes-per-author',
+            type=int,
+            default=10,
+            help='Количество рецептов у каждого автора',
+        )
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=8,
+            help='Количество ингредиентов в рецепте',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=20,
+            help='Среднее количество рецептов в избранном пользователя',
+        )
+        parser.add_argument(
+            '--carts',
+            type=int,
+            default=5,
+            help='Среднее количество рецептов в корзине пользователя',
+        )
+        parser.add_argument(
+            '--subscriptions',
+            type=int,
+            default=10,
+            help='Среднее количество подписок пользователя',
+        )
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для популярности рецептов',
+        )
+        parser.add_argument(
+            '--path',
+            type=str,
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Файл с ингредиентами',
+        )
+        parser.add_argument(
+            '--prefix',
+            type=str,
+            default='generated',
+            help='Префикс имён создаваемых пользователей',
+        )
+        parser.add_argument(
+            '--password',
+            type=str,
+            help='Пароль пользователей, по умолчанию вход по паролю закрыт',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.started = time.perf_counter()
+        with transaction.atomic():
+            tags = self.create_tags()
+            ingredients = self.create_ingredients(options['path'])
+            users = self.create_users(
+                options['users'], options['prefix'], options['password']
+            )
+            authors = users[:max(1, int(len(users) * options['authors']))]
+            recipes = self.create_recipes(
+                authors, options['recipes_per_author'], options['prefix']
+            )
+            self.create_recipe_relations(
+                recipes, tags, ingredients, options['ingredients_per_recipe']
+            )
+            weights = zipf_weights(len(recipes), options['zipf'])
+            for model, average in (
+                (Favorite, options['favorites']),
+                (ShoppingCart, options['carts']),
+            ):
+                self.create_user_recipes(
+                    model, users, recipes, weights, average
+                )
+            self.create_subscriptions(
+                users, authors, options['subscriptions'], options['zipf']
+            )
+            call_command('reconcile_counters', stdout=self.stdout)
+            call_command('rebuild_shopping_lists', stdout=self.stdout)
+            call_command(
+                'build_similar_recipes', full=True, stdout=self.stdout
+            )
+        objects_imported.send(sender=Ingredient)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - self.started:.1f} с'
+        ))
+
+    def report(self, model, count):
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {count}, '
+            f'{time.perf_counter() - self.started:.1f} с'
+        )
+
+    def bulk_create(self, model, objects, **kwargs):
+        created = model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+        self.report(model, len(created))
+        return created
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_ingredients(self, path):
+        with open(path, 'rt', encoding='utf-8') as csv_file:
+            self.bulk_create(
+                Ingredient,
+                [Ingredient(**row) for row in csv.DictReader(csv_file)],
+                ignore_conflicts=True,
+            )
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    def create_users(self, count, prefix, password):
+        password = make_password(password)
+        return self.bulk_create(User, [
+            User(
+                email=f'{prefix}{number}@foodgram.local',
+                username=f'{prefix}{number}',
+                first_name=f'Имя {number}',
+                last_name=f'Фамилия {number}',
+                password=password,
+            )
+            for number in range(count)
+        ])
+
+    def create_recipes(self, authors, count, prefix):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new('RGB', (640, 480), '#E26C2D').save(buffer, format='PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        return self.bulk_create(Recipe, [
+            Recipe(
+                author=author,
+                name=f'Рецепт {prefix} {author.id}-{number}',
+                text='Сгенерированный рецепт',
+                cooking_time=self.random.randint(5, 180),
+                image=IMAGE_NAME,
+            )
+            for author in authors
+            for number in range(count)
+        ])
+
+    def create_recipe_relations(self, recipes, tags, ingredients, count):
+        count = min(count, len(ingredients))
+        self.bulk_create(Recipe.tags.through, [
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag)
+            for recipe in recipes
+            for tag in self.random.sample(
+                tags, self.random.randint(1, len(tags))
+            )
+        ])
+        self.bulk_create(RecipeIngredient, [
+            RecipeIngredient(
+                recipe_id=recipe.id,
+                ingredient_id=ingredient,
+                amount=self.random.randint(1, 500),
+            )
+            for recipe in recipes
+            for ingredient in self.random.sample(ingredients, count)
+        ])
+
+    def sample(self, items, weights, average):
+        if not average:
+            return set()
+        size = min(len(items), int(self.random.expovariate(1 / average)))
+        return set(self.random.choices(items, cum_weights=weights, k=size))
+
+    def create_user_recipes(self, model, users, recipes, weights, average):
+        self.bulk_create(model, [
+            model(user_id=user.id, recipe_id=recipe.id)
+            for user in users
+            for recipe in self.sample(recipes, weights, average)
+        ], ignore_conflicts=True)
+
+    def create_subscriptions(self, users, authors, average, exponent):
+        weights = zipf_weights(len(authors), exponent)
+        self.bulk_create(Subscription, [
+            Subscription(user_id=user.id, author_id=author.id)
+            for user in users
+            for author in self.sample(authors, weights, average)
+            if author.id != user.id
+        ], ignore_conflicts=True)
@@ -1,8 +1,14 @@
 import csv
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 
 from django.apps import apps
-from django.core.management import BaseCommand
-from django.shortcuts import get_object_or_404
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import UniqueConstraint
+
+from recipes.signals import objects_imported
 
 MODELS_FIELDS = {}
 
@@ -18,16 +24,193 @@ class Command(BaseCommand):
             type=str,
             help="Название приложения, к которому подключена модель"
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одном INSERT',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Количество параллельных потоков записи',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Проверить файл без записи в базу данных',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загрузить файл через COPY (только PostgreSQL)',
+        )
 
     def handle(self, *args, **options):
-        file_path = options['path']
-        model = apps.get_model(options['app_name'], options['model_name'])
-        with open(file_path, 'rt', encoding='utf-8') as csv_file:
+        self.model = apps.get_model(options['app_name'], options['model_name'])
+        self.started = time.perf_counter()
+        self.processed = 0
+        with open(options['path'], 'rt', encoding='utf-8') as csv_file:
             reader = csv.DictReader(csv_file, delimiter=',')
-            for row in reader:
-                for field, value in row.items():
-                    if field in MODELS_FIELDS.keys():
-                        row[field] = get_object_or_404(
-                            MODELS_FIELDS[field], pk=value
-                        )
-                model.objects.create(**row)
+            self.set_conflict_options(reader.fieldnames)
+            if options['copy'] and not options['dry_run']:
+                self.copy(csv_file, reader.fieldnames)
+            else:
+                self.bulk_create(reader, options)
+        if not options['dry_run']:
+            objects_imported.send(sender=self.model)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Проверено" if options["dry_run"] else "Обработано"} '
+            f'строк: {self.processed}, {self.get_rate():.0f} строк/с'
+        ))
+
+    def set_conflict_options(self, fieldnames):
+        fieldnames = set(fieldnames)
+        unique_sets = [
+            set(constraint.fields)
+            for constraint in self.model._meta.constraints
+            if isinstance(constraint, UniqueConstraint)
+            and constraint.condition is None and constraint.fields
+        ]
+        unique_sets.extend(
+            {field.name}
+            for field in self.model._meta.concrete_fields
+            if field.unique and not field.primary_key
+        )
+        self.unique_fields = next(
+            (fields for fields in unique_sets if fields <= fieldnames), None
+        )
+        self.conflict_options = {}
+        if self.unique_fields is None:
+            self.stdout.write(self.style.WARNING(
+                'У модели нет ограничения уникальности по полям файла, '
+                'повторный импорт создаст дубликаты'
+            ))
+            return
+        update_fields = fieldnames - self.unique_fields
+        if update_fields:
+            self.conflict_options = {
+                'update_conflicts': True,
+                'unique_fields': sorted(self.unique_fields),
+                'update_fields': sorted(update_fields),
+            }
+        else:
+            self.conflict_options = {'ignore_conflicts': True}
+
+    def get_related_keys(self, fieldnames):
+        return {
+            field: set(
+                MODELS_FIELDS[field].objects.values_list('pk', flat=True)
+            )
+            for field in fieldnames
+            if field in MODELS_FIELDS
+        }
+
+    def build_objects(self, rows, start, related_keys):
+        objects = []
+        for line, row in enumerate(rows, start=start):
+            for field, keys in related_keys.items():
+                value = row.pop(field)
+                if int(value) not in keys:
+                    raise CommandError(
+                        f'Строка {line}: объект {field} с id <{value}> '
+                        'не существует'
+                    )
+                row[f'{field}_id'] = value
+            objects.append(self.model(**row))
+        return objects
+
+    def bulk_create(self, reader, options):
+        related_keys = self.get_related_keys(reader.fieldnames)
+        batch_size = options['batch_size']
+        workers = max(1, options['workers'])
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            line = 2
+            while True:
+                rows = list(islice(reader, batch_size))
+                if not rows:
+                    break
+                objects = self.build_objects(rows, line, related_keys)
+                line += len(rows)
+                if options['dry_run']:
+                    self.report(len(objects))
+                    continue
+                if workers == 1:
+                    self.report(self.save_batch(objects))
+                    continue
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.report(future.result())
+                pending.add(
+                    executor.submit(self.save_batch_in_thread, objects)
+                )
+            for future in pending:
+                self.report(future.result())
+
+    def save_batch(self, objects):
+        self.model.objects.bulk_create(objects, **self.conflict_options)
+        return len(objects)
+
+    def save_batch_in_thread(self, objects):
+        try:
+            return self.save_batch(objects)
+        finally:
+            connection.close()
+
+    def copy(self, csv_file, fieldnames):
+        if connection.vendor != 'postgresql':
+            raise CommandError('COPY поддерживается только в PostgreSQL')
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = ', '.join(map(self.get_column, fieldnames))
+        conflict = ''
+        if self.unique_fields is not None:
+            target = ', '.join(
+                map(self.get_column, sorted(self.unique_fields))
+            )
+            updates = ', '.join(
+                f'{column} = EXCLUDED.{column}'
+                for column in map(
+                    self.get_column,
+                    self.conflict_options.get('update_fields', ())
+                )
+            )
+            action = f'UPDATE SET {updates}' if updates else 'NOTHING'
+            conflict = f'ON CONFLICT ({target}) DO {action}'
+        definitions = ', '.join(
+            f'{self.get_column(field)} '
+            f'{self.model._meta.get_field(field).db_type(connection)}'
+            for field in fieldnames
+        )
+        csv_file.seek(0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE import_rows ({definitions}) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                f'COPY import_rows ({columns}) FROM STDIN WITH CSV HEADER',
+                csv_file,
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM import_rows {conflict}'
+            )
+            self.report(cursor.rowcount)
+
+    def get_column(self, field):
+        return connection.ops.quote_name(
+            self.model._meta.get_field(field).column
+        )
+
+    def report(self, count):
+        self.processed += count
+        self.stdout.write(
+            f'Обработано строк: {self.processed}, '
+            f'{self.get_rate():.0f} строк/с'
+        )
+
+    def get_rate(self):
+        return self.processed / max(time.perf_counter() - self.started, 1e-9)
@@ -0,0 +1,47 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from api.functions import bump_shopping_list_version
+from recipes.models import RecipeIngredient, ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересборка списков покупок из корзин пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help='id пользователя, список которого нужно пересобрать',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        items = ShoppingListItem.objects.all()
+        carts = {'recipe__carts__isnull': False}
+        if options['user'] is not None:
+            items = items.filter(user_id=options['user'])
+            carts = {'recipe__carts__user_id': options['user']}
+        totals = RecipeIngredient.objects.filter(**carts).values(
+            'recipe__carts__user', 'ingredient'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by()
+        with transaction.atomic():
+            deleted, _ = items.delete()
+            created = ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=item['recipe__carts__user'],
+                        ingredient_id=item['ingredient'],
+                        total_amount=item['total'],
+                    )
+                    for item in totals.iterator()
+                ),
+                batch_size=options['batch_size'],
+            )
+            bump_shopping_list_version(options['user'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено записей: {deleted}, создано: {len(created)}'
+        ))
@@ -0,0 +1,186 @@
+# Generated by Django 4.2.4 on 2026-10-18 20:22
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INGREDIENT_NAMES = (
+    "SELECT {aggregate}(i.name, ' ') "
+    'FROM recipes_recipeingredient AS ri '
+    'INNER JOIN recipes_ingredient AS i ON i.id = ri.ingredient_id '
+    'WHERE ri.recipe_id = {recipe}'
+)
+
+POSTGRESQL_CREATE = (
+    'CREATE OR REPLACE FUNCTION recipes_recipe_search_vector() '
+    'RETURNS trigger AS $$ BEGIN '
+    "NEW.search_vector := setweight(to_tsvector('russian', "
+    "coalesce(NEW.name, '')), 'A') "
+    "|| setweight(to_tsvector('russian', coalesce(("
+    + INGREDIENT_NAMES.format(aggregate='string_agg', recipe='NEW.id')
+    + "), '')), 'B') "
+    "|| setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'C'); "
+    'RETURN NEW; END $$ LANGUAGE plpgsql',
+    'CREATE TRIGGER recipes_recipe_search_vector '
+    'BEFORE INSERT OR UPDATE OF name, text, search_vector '
+    'ON recipes_recipe FOR EACH ROW '
+    'EXECUTE FUNCTION recipes_recipe_search_vector()',
+    'CREATE OR REPLACE FUNCTION recipes_recipeingredient_search_vector() '
+    'RETURNS trigger AS $$ BEGIN '
+    "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+    'UPDATE recipes_recipe SET search_vector = NULL '
+    'WHERE id IN (SELECT recipe_id FROM new_rows); END IF; '
+    "IF TG_OP IN ('UPDATE', 'DELETE') THEN "
+    'UPDATE recipes_recipe SET search_vector = NULL '
+    'WHERE id IN (SELECT recipe_id FROM old_rows); END IF; '
+    'RETURN NULL; END $$ LANGUAGE plpgsql',
+    'CREATE TRIGGER recipes_recipeingredient_search_insert '
+    'AFTER INSERT ON recipes_recipeingredient '
+    'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT '
+    'EXECUTE FUNCTION recipes_recipeingredient_search_vector()',
+    'CREATE TRIGGER recipes_recipeingredient_search_update '
+    'AFTER UPDATE ON recipes_recipeingredient '
+    'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+    'FOR EACH STATEMENT '
+    'EXECUTE FUNCTION recipes_recipeingredient_search_vector()',
+    'CREATE TRIGGER recipes_recipeingredient_search_delete '
+    'AFTER DELETE ON recipes_recipeingredient '
+    'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT '
+    'EXECUTE FUNCTION recipes_recipeingredient_search_vector()',
+    'CREATE OR REPLACE FUNCTION recipes_ingredient_search_vector() '
+    'RETURNS trigger AS $$ BEGIN '
+    'UPDATE recipes_recipe SET search_vector = NULL WHERE id IN ('
+    'SELECT ri.recipe_id FROM recipes_recipeingredient AS ri '
+    'INNER JOIN new_rows ON new_rows.id = ri.ingredient_id '
+    'INNER JOIN old_rows ON old_rows.id = new_rows.id '
+    'WHERE new_rows.name IS DISTINCT FROM old_rows.name); '
+    'RETURN NULL; END $$ LANGUAGE plpgsql',
+    'CREATE TRIGGER recipes_ingredient_search_update '
+    'AFTER UPDATE ON recipes_ingredient '
+    'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+    'FOR EACH STATEMENT '
+    'EXECUTE FUNCTION recipes_ingredient_search_vector()',
+    'UPDATE recipes_recipe SET search_vector = NULL',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin '
+    'ON recipes_recipe USING gin (search_vector)',
+)
+
+POSTGRESQL_DROP = (
+    'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin',
+    'DROP TRIGGER IF EXISTS recipes_ingredient_search_update '
+    'ON recipes_ingredient',
+    'DROP FUNCTION IF EXISTS recipes_ingredient_search_vector()',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_insert '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_update '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_delete '
+    'ON recipes_recipeingredient',
+    'DROP FUNCTION IF EXISTS recipes_recipeingredient_search_vector()',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_vector ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector()',
+)
+
+SQLITE_INGREDIENTS = (
+    'UPDATE recipes_recipe_search SET ingredients = ('
+    + INGREDIENT_NAMES.format(aggregate='group_concat', recipe='{recipe}')
+    + ') WHERE rowid {condition};'
+)
+
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE recipes_recipe_search USING fts5('
+    "name, text, ingredients, tokenize = 'unicode61 remove_diacritics 2')",
+    'INSERT INTO recipes_recipe_search (recipes_recipe_search, rank) '
+    "VALUES ('rank', 'bm25(10.0, 1.0, 4.0)')",
+    'CREATE TRIGGER recipes_recipe_search_insert '
+    'AFTER INSERT ON recipes_recipe BEGIN '
+    'INSERT INTO recipes_recipe_search (rowid, name, text, ingredients) '
+    "VALUES (NEW.id, NEW.name, NEW.text, ''); END",
+    'CREATE TRIGGER recipes_recipe_search_update '
+    'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+    'UPDATE recipes_recipe_search SET name = NEW.name, text = NEW.text '
+    'WHERE rowid = NEW.id; END',
+    'CREATE TRIGGER recipes_recipe_search_delete '
+    'AFTER DELETE ON recipes_recipe BEGIN '
+    'DELETE FROM recipes_recipe_search WHERE rowid = OLD.id; END',
+    'CREATE TRIGGER recipes_recipeingredient_search_insert '
+    'AFTER INSERT ON recipes_recipeingredient BEGIN '
+    + SQLITE_INGREDIENTS.format(
+        recipe='NEW.recipe_id', condition='= NEW.recipe_id'
+    )
+    + ' END',
+    'CREATE TRIGGER recipes_recipeingredient_search_update '
+    'AFTER UPDATE OF recipe_id, ingredient_id '
+    'ON recipes_recipeingredient BEGIN '
+    + SQLITE_INGREDIENTS.format(
+        recipe='OLD.recipe_id', condition='= OLD.recipe_id'
+    )
+    + ' '
+    + SQLITE_INGREDIENTS.format(
+        recipe='NEW.recipe_id', condition='= NEW.recipe_id'
+    )
+    + ' END',
+    'CREATE TRIGGER recipes_recipeingredient_search_delete '
+    'AFTER DELETE ON recipes_recipeingredient BEGIN '
+    + SQLITE_INGREDIENTS.format(
+        recipe='OLD.recipe_id', condition='= OLD.recipe_id'
+    )
+    + ' END',
+    'CREATE TRIGGER recipes_ingredient_search_update '
+    'AFTER UPDATE OF name ON recipes_ingredient BEGIN '
+    + SQLITE_INGREDIENTS.format(
+        recipe='recipes_recipe_search.rowid',
+        condition=(
+            'IN (SELECT recipe_id FROM recipes_recipeingredient '
+            'WHERE ingredient_id = NEW.id)'
+        ),
+    )
+    + ' END',
+    'INSERT INTO recipes_recipe_search (rowid, name, text, ingredients) '
+    'SELECT r.id, r.name, r.text, coalesce(('
+    + INGREDIENT_NAMES.format(aggregate='group_concat', recipe='r.id')
+    + "), '') FROM recipes_recipe AS r",
+)
+
+SQLITE_DROP = (
+    'DROP TRIGGER IF EXISTS recipes_ingredient_search_update',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_update',
+    'DROP TRIGGER IF EXISTS recipes_recipeingredient_search_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_update',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_delete',
+    'DROP TABLE IF EXISTS recipes_recipe_search',
+)
+
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_CREATE, POSTGRESQL_DROP),
+    'sqlite': (SQLITE_CREATE, SQLITE_DROP),
+}
+
+
+def create_search_index(apps, schema_editor):
+    create, _ = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in create:
+        schema_editor.execute(statement, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    _, drop = STATEMENTS.get(schema_editor.connection.vendor, ((), ()))
+    for statement in drop:
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_similar_changed_recipe_similar_updated_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
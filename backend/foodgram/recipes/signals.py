@@ -0,0 +1,3 @@
+from django.dispatch import Signal
+
+objects_imported = Signal()
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem)
+from users.models import User
+
+
+class RebuildShoppingListsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='password12345',
+            )
+            for number in range(3)
+        ]
+        cls.ingredient = Ingredient.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+        recipes = [
+            Recipe.objects.create(
+                author=cls.users[0],
+                name=f'Рецепт {number}',
+                text='Описание',
+                cooking_time=10,
+                image='recipes/images/recipe.png',
+            )
+            for number in range(2)
+        ]
+        for recipe in recipes:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=10
+            )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipes[0]) for user in cls.users
+        )
+        ShoppingCart.objects.create(user=cls.users[0], recipe=recipes[1])
+
+    def get_totals(self):
+        return dict(ShoppingListItem.objects.filter(
+            ingredient=self.ingredient
+        ).values_list('user_id', 'total_amount'))
+
+    def test_rebuild_all(self):
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assertEqual(self.get_totals(), {
+            self.users[0].id: 20,
+            self.users[1].id: 10,
+            self.users[2].id: 10,
+        })
+
+    def test_rebuild_one_user(self):
+        for user in self.users:
+            with self.subTest(user=user.username):
+                ShoppingListItem.objects.all().delete()
+                call_command(
+                    'rebuild_shopping_lists', user=user.id, stdout=StringIO()
+                )
+                expected = 20 if user == self.users[0] else 10
+                self.assertEqual(self.get_totals(), {user.id: expected})
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as MainUserAdmin
+from foodgram.paginators import EstimatedCountPaginator
 
 from .models import Subscription, User
 
@@ -13,16 +14,23 @@ class UserAdmin(MainUserAdmin):
         'first_name',
         'last_name',
         'password',
+        'recipes_count',
+        'subscribers_count',
     )
     list_editable = ('password',)
-    list_filter = ('first_name', 'username', 'email',)
+    list_filter = ('is_staff', 'is_active',)
     search_fields = ('username', 'email',)
     empty_value_display = '-пусто-'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'author',)
-    list_filter = ('user', 'author',)
-    search_fields = ('user', 'author',)
+    list_select_related = ('user', 'author',)
+    search_fields = ('user__username', 'author__username',)
+    autocomplete_fields = ('user', 'author',)
     empty_value_display = '-пусто-'
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
@@ -3,6 +3,8 @@ from django.db import models
 
 from .validators import validate_username
 
+COUNTER_FIELDS = ('recipes_count', 'subscribers_count')
+
 
 class User(AbstractUser):
     USERNAME_FIELD = 'email'
@@ -31,6 +33,16 @@ class User(AbstractUser):
         'Пароль',
         max_length=150,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('username',)
@@ -40,6 +52,14 @@ class User(AbstractUser):
     def __str__(self):
         return f'{self.username} {self.email}'
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Subscription(models.Model):
     user = models.ForeignKey(
@@ -69,6 +89,12 @@ class Subscription(models.Model):
                 name='prevent_self_subscription',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'),
+                name='subscription_author_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписан на {self.author}'